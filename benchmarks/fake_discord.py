@@ -0,0 +1,97 @@
+"""Minimal stand-ins for the parts of discord.py the poller talks to."""
+import asyncio
+import itertools
+from dataclasses import dataclass, field
+import discord
+
+
+_ids = itertools.count(10_000)
+
+
+@dataclass
+class FakeThread:
+    id: int
+    name: str
+    messages: list[str] = field(default_factory=list)
+
+    async def send(self, content: str):
+        self.messages.append(content)
+
+
+@dataclass
+class FakeThreadWithMessage:
+    thread: FakeThread
+
+
+@dataclass
+class FakeWebhookMessage:
+    channel: FakeThread
+
+
+class FakeWebhook:
+    """Webhook that creates threads in its forum channel like Webhook.send(thread_name=...)."""
+
+    def __init__(self, channel: "FakeForumChannel"):
+        self.id = next(_ids)
+        self.token = f"token-{self.id}"
+        self.channel = channel
+
+    async def send(self, content: str, *, thread_name: str | None = None, thread=None, wait: bool = False, **kwargs):
+        if self.channel.latency:
+            await asyncio.sleep(self.channel.latency)
+        if thread_name is not None:
+            self.channel.created.append((thread_name, content))
+            thread = FakeThread(next(_ids), thread_name)
+            self.channel.created_threads.append(thread)
+        else:
+            thread = next(created for created in self.channel.created_threads if created.id == thread.id)
+            thread.messages.append(content)
+        return FakeWebhookMessage(thread) if wait else None
+
+
+class FakeForumChannel(discord.ForumChannel):
+    """ForumChannel that records create_thread calls instead of calling Discord."""
+
+    def __init__(self, channel_id: int, latency: float = 0.0):
+        # Deliberately skips ForumChannel.__init__, which needs gateway data
+        self.id = channel_id
+        self.latency = latency
+        self.created: list[tuple[str, str]] = []
+        self.created_threads: list[FakeThread] = []
+
+    async def create_thread(self, *, name: str, content: str | None = None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.created.append((name, content))
+        thread = FakeThread(next(_ids), name)
+        self.created_threads.append(thread)
+        return FakeThreadWithMessage(thread)
+
+    async def create_webhook(self, *, name: str, **kwargs):
+        return FakeWebhook(self)
+
+
+class FakeHTTP:
+    def __init__(self):
+        self.deleted: list[int] = []
+
+    async def delete_channel(self, channel_id: int, *, reason: str | None = None):
+        self.deleted.append(channel_id)
+
+
+class FakeClient:
+    """Enough of discord.Client for RSSPoller and CleanupManager."""
+
+    def __init__(self, channels: list[FakeForumChannel]):
+        self.channels = {channel.id: channel for channel in channels}
+        self.http = FakeHTTP()
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    async def wait_until_ready(self):
+        return None
+
+    @property
+    def thread_count(self) -> int:
+        return sum(len(channel.created) for channel in self.channels.values())
@@ -0,0 +1,145 @@
+"""Local HTTP server that serves synthetic RSS and Atom feeds for benchmarking."""
+import asyncio
+import hashlib
+import random
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from aiohttp import web
+
+
+@dataclass
+class FeedServerConfig:
+    feeds: int = 100
+    items: int = 20
+    item_size: int = 500
+    latency: float = 0.0
+    change_rate: float = 0.1
+    # Feeds are spread over 127.0.0.1 .. 127.0.0.<hosts> so per-host limits apply
+    # realistically; addresses other than 127.0.0.1 only exist on Linux
+    hosts: int = 1
+    seed: int = 1
+    # WebSub hub advertised by every feed, with the feed's own URL as rel="self"
+    hub: str | None = None
+
+
+@dataclass
+class _FeedState:
+    newest_item: int
+    format: str
+    etag: str = ""
+
+
+@dataclass
+class MockFeedServer:
+    """
+    Serves /feed/<n>.xml for n in range(config.feeds), on config.hosts loopback addresses.
+    Even feeds are RSS 2.0, odd feeds Atom. advance() publishes new items in a
+    change_rate fraction of feeds, everything else answers 304 to conditional GETs.
+    """
+    config: FeedServerConfig
+    requests: int = 0
+    not_modified: int = 0
+    bytes_sent: int = 0
+    # Feeds that got a new item in the last advance()
+    last_changed: list[int] = field(default_factory=list)
+    _states: list[_FeedState] = field(default_factory=list)
+    _runner: web.AppRunner | None = None
+    _ports: list[int] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._random = random.Random(self.config.seed)
+        self._states = [
+            _FeedState(newest_item=self.config.items, format="rss" if n % 2 == 0 else "atom")
+            for n in range(self.config.feeds)
+        ]
+        for n in range(self.config.feeds):
+            self._update_etag(n)
+
+    def url(self, n: int) -> str:
+        host = n % len(self._ports)
+        return f"http://127.0.0.{host + 1}:{self._ports[host]}/feed/{n}.xml"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/feed/{n}.xml", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        for host in range(max(self.config.hosts, 1)):
+            site = web.TCPSite(self._runner, f"127.0.0.{host + 1}", 0, backlog=1024)
+            await site.start()
+            self._ports.append(site._server.sockets[0].getsockname()[1])
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def advance(self) -> int:
+        """Publish one new item in a random subset of feeds. Returns how many feeds changed."""
+        self.last_changed = []
+        for n, state in enumerate(self._states):
+            if self._random.random() < self.config.change_rate:
+                state.newest_item += 1
+                self._update_etag(n)
+                self.last_changed.append(n)
+        return len(self.last_changed)
+
+    def _update_etag(self, n: int):
+        state = self._states[n]
+        state.etag = '"' + hashlib.md5(f"{n}:{state.newest_item}".encode()).hexdigest() + '"'
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency)
+
+        n = int(request.match_info["n"])
+        if n >= len(self._states):
+            raise web.HTTPNotFound()
+        state = self._states[n]
+
+        if request.headers.get("If-None-Match") == state.etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={"ETag": state.etag})
+
+        body = self._render(n, state)
+        self.bytes_sent += len(body)
+        content_type = "application/rss+xml" if state.format == "rss" else "application/atom+xml"
+        return web.Response(body=body, content_type=content_type, headers={"ETag": state.etag})
+
+    def _render(self, n: int, state: _FeedState) -> bytes:
+        filler = "<p>" + ("Lorem ipsum dolor sit amet. " * (self.config.item_size // 28 + 1))[:self.config.item_size] + "</p>"
+        first = max(state.newest_item - self.config.items, 0)
+        numbers = range(state.newest_item, first, -1)
+
+        links = ""
+        if self.config.hub:
+            links = f'<atom:link rel="hub" href="{self.config.hub}"/><atom:link rel="self" href="{self.url(n)}"/>'
+
+        if state.format == "rss":
+            items = "".join(
+                f"<item><guid isPermaLink=\"false\">feed-{n}-item-{i}</guid>"
+                f"<title>Feed {n} item {i}</title><link>http://example.invalid/{n}/{i}</link>"
+                f"<pubDate>{formatdate(1_700_000_000 + i * 3600, usegmt=True)}</pubDate>"
+                f"<description><![CDATA[{filler}]]></description></item>"
+                for i in numbers
+            )
+            document = (
+                f'<?xml version="1.0" encoding="utf-8"?>'
+                f'<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom"><channel>'
+                f"<title>Feed {n}</title><link>http://example.invalid/{n}</link>{links}{items}</channel></rss>"
+            )
+        else:
+            entries = "".join(
+                f"<entry><id>urn:feed-{n}:item-{i}</id><title>Feed {n} item {i}</title>"
+                f'<link href="http://example.invalid/{n}/{i}"/>'
+                f"<updated>2023-11-14T{i % 24:02d}:00:00Z</updated>"
+                f'<summary type="html"><![CDATA[{filler}]]></summary></entry>'
+                for i in numbers
+            )
+            document = (
+                f'<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom" '
+                f'xmlns:atom="http://www.w3.org/2005/Atom">'
+                f"<title>Feed {n}</title><id>urn:feed-{n}</id><updated>2023-11-14T00:00:00Z</updated>"
+                f"{links}{entries}</feed>"
+            )
+        return document.encode()
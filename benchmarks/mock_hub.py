@@ -0,0 +1,117 @@
+"""Local stand-in for a WebSub hub, to exercise push ingestion without the internet."""
+import asyncio
+import hashlib
+import hmac
+import secrets
+from dataclasses import dataclass, field
+import aiohttp
+from aiohttp import web
+
+
+@dataclass
+class _Subscription:
+    callback: str
+    secret: str | None
+    lease_seconds: int
+
+
+@dataclass
+class MockHub:
+    """
+    Serves a hub endpoint on 127.0.0.1. Subscribe and unsubscribe requests are
+    accepted with 202 and verified against the callback in the background, as
+    real hubs do. publish() fetches a topic (or takes a body) and delivers it
+    to every verified subscriber, signed with its secret.
+    """
+    lease_seconds: int = 86400
+    requests: int = 0
+    verified: int = 0
+    deliveries: int = 0
+    subscriptions: dict[str, dict[str, _Subscription]] = field(default_factory=dict)
+    _runner: web.AppRunner | None = None
+    _port: int = 0
+    _session: aiohttp.ClientSession | None = None
+    _pending: set[asyncio.Task] = field(default_factory=set)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._port}/hub"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/hub", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self._port = site._server.sockets[0].getsockname()[1]
+        self._session = aiohttp.ClientSession()
+
+    async def stop(self):
+        for task in self._pending:
+            task.cancel()
+        if self._session is not None:
+            await self._session.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def settle(self):
+        """Wait for every verification of intent started so far."""
+        while self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    async def publish(self, topic: str, body: bytes | None = None, content_type: str = "application/xml") -> int:
+        """Deliver the topic's current content to its subscribers. Returns how many accepted it."""
+        if body is None:
+            async with self._session.get(topic) as response:
+                body = await response.read()
+                content_type = response.headers.get("Content-Type", content_type)
+        accepted = 0
+        for subscription in list(self.subscriptions.get(topic, {}).values()):
+            headers = {"Content-Type": content_type, "Link": f'<{self.url}>; rel="hub", <{topic}>; rel="self"'}
+            if subscription.secret:
+                signature = hmac.new(subscription.secret.encode(), body, hashlib.sha256).hexdigest()
+                headers["X-Hub-Signature"] = f"sha256={signature}"
+            async with self._session.post(subscription.callback, data=body, headers=headers) as response:
+                self.deliveries += 1
+                if response.status == 410:
+                    self.subscriptions[topic].pop(subscription.callback, None)
+                elif response.status < 300:
+                    accepted += 1
+        return accepted
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        form = await request.post()
+        mode = form.get("hub.mode")
+        if mode == "publish":
+            topic = form.get("hub.url") or form.get("hub.topic")
+            self._spawn(self.publish(topic))
+            return web.Response(status=204)
+
+        topic, callback = form.get("hub.topic"), form.get("hub.callback")
+        if mode not in ("subscribe", "unsubscribe") or not topic or not callback:
+            raise web.HTTPBadRequest(text="hub.mode, hub.topic and hub.callback are required")
+        lease_seconds = min(int(form.get("hub.lease_seconds") or self.lease_seconds), self.lease_seconds)
+        self._spawn(self._verify_intent(mode, topic, callback, form.get("hub.secret"), lease_seconds))
+        return web.Response(status=202)
+
+    async def _verify_intent(self, mode: str, topic: str, callback: str, secret: str | None, lease_seconds: int):
+        challenge = secrets.token_hex(16)
+        params = {"hub.mode": mode, "hub.topic": topic, "hub.challenge": challenge}
+        if mode == "subscribe":
+            params["hub.lease_seconds"] = str(lease_seconds)
+        async with self._session.get(callback, params=params) as response:
+            confirmed = response.status < 300 and await response.text() == challenge
+        if not confirmed:
+            return
+        self.verified += 1
+        if mode == "subscribe":
+            self.subscriptions.setdefault(topic, {})[callback] = _Subscription(callback, secret, lease_seconds)
+        else:
+            self.subscriptions.get(topic, {}).pop(callback, None)
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
@@ -0,0 +1,203 @@
+"""
+Benchmark the poll pipeline against a local mock feed server and a fake Discord client.
+
+    python -m benchmarks.poll_pipeline --feeds 10,100,1000,10000
+
+Every size gets a fresh database. The first cycle is cold: each feed is new
+and posts its backlog. The following cycles publish new items in a
+--change-rate fraction of feeds; the rest should answer 304. The fetch
+cache is off unless --env FETCH_CACHE_SECONDS=... turns it on.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from bot import db
+from benchmarks.fake_discord import FakeClient, FakeForumChannel
+from benchmarks.mock_feeds import FeedServerConfig, MockFeedServer
+
+
+@dataclass
+class CycleResult:
+    feeds: int
+    cycle: int
+    wall_time: float
+    posts: int
+    db_ops: int
+    peak_rss_mb: float
+    max_loop_lag_ms: float
+    p99_loop_lag_ms: float
+
+    @property
+    def posts_per_second(self) -> float:
+        return self.posts / self.wall_time if self.wall_time else 0.0
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a task that sleeps in short steps."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def max_ms(self) -> float:
+        return max(self.samples, default=0.0) * 1000
+
+    def p99_ms(self) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000
+
+
+def peak_rss_mb() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+async def run_size(feed_count: int, args) -> list[CycleResult]:
+    # Imported late so environment overrides from the command line apply
+    from bot.outbox import OutboxDrainer
+    from bot.rss_poller import RSSPoller
+
+    server = MockFeedServer(FeedServerConfig(
+        feeds=feed_count,
+        items=args.items,
+        item_size=args.item_size,
+        latency=args.latency_ms / 1000,
+        change_rate=args.change_rate,
+        hosts=args.hosts,
+    ))
+    await server.start()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        db.DB_PATH = os.path.join(directory, "bench.db")
+        await db.init_db()
+
+        db_ops = 0
+
+        def count_statement(_statement):
+            nonlocal db_ops
+            db_ops += 1
+
+        connection = db.get_connection()
+        channels = [FakeForumChannel(1000 + i, args.post_latency_ms / 1000) for i in range(args.channels)]
+        client = FakeClient(channels)
+
+        await connection.executemany(
+            "INSERT INTO feeds (guild_id, forum_channel_id, url, name) VALUES (?, ?, ?, ?)",
+            [(1, channels[n % len(channels)].id, server.url(n), f"Feed {n}") for n in range(feed_count)],
+        )
+        await connection.commit()
+        await connection.set_trace_callback(count_statement)
+
+        outbox = OutboxDrainer(client)
+        poller = RSSPoller(client, outbox)
+        monitor = LoopLagMonitor()
+        try:
+            for cycle in range(args.cycles):
+                if cycle > 0:
+                    server.advance()
+                feeds = await db.get_all_feeds()
+                posts_before = client.thread_count
+                db_ops = 0
+
+                monitor.start()
+                started = time.perf_counter()
+                await poller._run_cycle(feeds)
+                # Posting is decoupled from polling; a cycle counts until its posts are out
+                await outbox.drain_once()
+                await outbox.join()
+                wall_time = time.perf_counter() - started
+                await monitor.stop()
+
+                results.append(CycleResult(
+                    feeds=feed_count,
+                    cycle=cycle,
+                    wall_time=wall_time,
+                    posts=client.thread_count - posts_before,
+                    db_ops=db_ops,
+                    peak_rss_mb=peak_rss_mb(),
+                    max_loop_lag_ms=monitor.max_ms(),
+                    p99_loop_lag_ms=monitor.p99_ms(),
+                ))
+                print(format_row(results[-1]), flush=True)
+        finally:
+            await poller.close()
+            await outbox.close()
+            await connection.set_trace_callback(None)
+            await db.close_db()
+            await server.stop()
+    return results
+
+
+HEADER = f"{'feeds':>7} {'cycle':>5} {'wall s':>8} {'posts':>7} {'posts/s':>9} {'db ops':>8} {'rss MB':>7} {'lag max ms':>10} {'lag p99 ms':>10}"
+
+
+def format_row(result: CycleResult) -> str:
+    return (
+        f"{result.feeds:>7} {result.cycle:>5} {result.wall_time:>8.2f} {result.posts:>7} "
+        f"{result.posts_per_second:>9.1f} {result.db_ops:>8} {result.peak_rss_mb:>7.1f} "
+        f"{result.max_loop_lag_ms:>10.1f} {result.p99_loop_lag_ms:>10.1f}"
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feeds", default="10,100,1000,10000", help="comma separated feed counts")
+    parser.add_argument("--cycles", type=int, default=3, help="poll cycles per feed count")
+    parser.add_argument("--items", type=int, default=20, help="items per feed document")
+    parser.add_argument("--item-size", type=int, default=500, help="bytes of HTML per item")
+    parser.add_argument("--latency-ms", type=float, default=20, help="mock server response latency")
+    parser.add_argument("--change-rate", type=float, default=0.1, help="fraction of feeds changing per cycle")
+    parser.add_argument("--hosts", type=int, default=10 if sys.platform.startswith("linux") else 1,
+                        help="loopback addresses to spread feeds over (more than 1 needs Linux)")
+    parser.add_argument("--channels", type=int, default=20, help="number of fake forum channels")
+    parser.add_argument("--post-latency-ms", type=float, default=0, help="fake create_thread latency")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="bot setting to override, e.g. --env PARSE_WORKERS=4")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    # Cycles follow each other within seconds; reused downloads would hide every change
+    os.environ.setdefault("FETCH_CACHE_SECONDS", "0")
+    for override in args.env:
+        name, _, value = override.partition("=")
+        os.environ[name] = value
+
+    logging.basicConfig(level=logging.WARNING)
+    print(HEADER)
+    for feed_count in (int(value) for value in args.feeds.split(",")):
+        await run_size(feed_count, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,151 @@
+"""
+Exercise WebSub push ingestion against a local stand-in hub.
+
+    python -m benchmarks.websub_roundtrip --feeds 100
+
+Every mock feed advertises the hub. One poll cycle discovers it and the
+subscriptions are verified by the hub. Then --rounds times, a share of the
+feeds publish a new item, the hub pushes them, and the time until the posts
+are delivered is measured; the poller fetches nothing during a round. A
+forged notification is sent at the end to check it is ignored.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import tempfile
+import time
+from bot import db
+from benchmarks.fake_discord import FakeClient, FakeForumChannel
+from benchmarks.mock_feeds import FeedServerConfig, MockFeedServer
+from benchmarks.mock_hub import MockHub
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+async def wait_for_ingests(poller):
+    while poller.websub._ingests:
+        await asyncio.gather(*poller.websub._ingests, return_exceptions=True)
+
+
+async def due_renewals(connection) -> int:
+    cursor = await connection.execute("SELECT COUNT(*) FROM websub_subscriptions WHERE renew_at <= ?", (time.time(),))
+    (due,) = await cursor.fetchone()
+    return due
+
+
+async def run(args):
+    port = free_port()
+    os.environ["WEBSUB_CALLBACK_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["WEBSUB_HOST"] = "127.0.0.1"
+    os.environ["WEBSUB_PORT"] = str(port)
+    # Imported late so the settings above apply
+    from bot.outbox import OutboxDrainer
+    from bot.rss_poller import RSSPoller
+
+    hub = MockHub()
+    await hub.start()
+    server = MockFeedServer(FeedServerConfig(feeds=args.feeds, change_rate=args.change_rate, hub=hub.url))
+    await server.start()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db.DB_PATH = os.path.join(directory, "websub.db")
+        await db.init_db()
+        connection = db.get_connection()
+        channel = FakeForumChannel(1000)
+        client = FakeClient([channel])
+        await connection.executemany(
+            "INSERT INTO feeds (guild_id, forum_channel_id, url, name) VALUES (?, ?, ?, ?)",
+            [(1, channel.id, server.url(n), f"Feed {n}") for n in range(args.feeds)],
+        )
+        await connection.commit()
+
+        outbox = OutboxDrainer(client)
+        poller = RSSPoller(client, outbox)
+        await poller.websub.start_server()
+        try:
+            await poller._run_cycle(await db.get_all_feeds())
+            await outbox.drain_once()
+            await outbox.join()
+            # Each pass sends at most RENEWAL_BATCH_SIZE requests
+            due = await due_renewals(connection)
+            while due:
+                await poller.websub.renew_once()
+                due, before = await due_renewals(connection), due
+                if due >= before:
+                    break
+            await hub.settle()
+            active = sum(len(callbacks) for callbacks in hub.subscriptions.values())
+            print(f"subscriptions verified by the hub: {active}/{args.feeds}")
+            if active < args.feeds:
+                raise SystemExit("not every feed was subscribed, the rounds would only measure some of them")
+
+            for round_number in range(args.rounds):
+                server.advance()
+                posts_before = client.thread_count
+                requests_before = server.requests
+                started = time.perf_counter()
+                for n in server.last_changed:
+                    await hub.publish(server.url(n))
+                await wait_for_ingests(poller)
+                await outbox.drain_once()
+                await outbox.join()
+                elapsed = time.perf_counter() - started
+                print(
+                    f"round {round_number}: {len(server.last_changed)} feeds pushed, "
+                    f"{client.thread_count - posts_before} posts in {elapsed * 1000:.0f} ms, "
+                    f"{server.requests - requests_before - len(server.last_changed)} poller fetches"
+                )
+
+            # A safety poll reschedules pushed feeds at the safety interval
+            await poller._run_cycle(await db.get_all_feeds())
+            cursor = await connection.execute("SELECT MIN(next_poll_at), MAX(next_poll_at) FROM feeds")
+            earliest, latest = await cursor.fetchone()
+            now = time.time()
+            print(f"next polls in {(earliest - now) / 60:.0f}-{(latest - now) / 60:.0f} minutes")
+
+            server.advance()
+            topic = server.url(server.last_changed[0]) if server.last_changed else server.url(0)
+            posts_before = client.thread_count
+            for subscription in hub.subscriptions[topic].values():
+                subscription.secret = "not the secret"
+            await hub.publish(topic)
+            await wait_for_ingests(poller)
+            await outbox.drain_once()
+            await outbox.join()
+            print(f"forged notification ignored: {client.thread_count == posts_before}")
+        finally:
+            await poller.close()
+            await outbox.close()
+            await db.close_db()
+            await server.stop()
+            await hub.stop()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feeds", type=int, default=100, help="number of hub-enabled feeds")
+    parser.add_argument("--rounds", type=int, default=3, help="publish rounds")
+    parser.add_argument("--change-rate", type=float, default=0.2, help="fraction of feeds publishing per round")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="bot setting to override, e.g. --env PARSE_WORKERS=4")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    for override in args.env:
+        name, _, value = override.partition("=")
+        os.environ[name] = value
+
+    logging.basicConfig(level=logging.WARNING)
+    await run(args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
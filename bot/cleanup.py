@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+import discord
+from bot import db, metrics
+from bot.config import get_cleanup_concurrency
+from bot.posting import MAX_ATTEMPTS, backoff_delay, is_retryable
+
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between edits of the status message
+PROGRESS_INTERVAL_SECONDS = 3.0
+
+
+class CleanupManager:
+    """
+    Removes feeds together with their forum posts as persisted cleanup jobs.
+
+    Every deleted thread also removes its feed_posts row, so a job that is
+    interrupted by a restart resumes with only the threads that are left.
+    """
+
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+        self.concurrency = get_cleanup_concurrency()
+        self._jobs: dict[int, asyncio.Task] = {}
+
+    async def remove_feed(self, feed_id: int, status_message: discord.Message) -> tuple[int, int, int]:
+        """
+        Delete a feed's forum posts, then the feed itself, editing status_message as it goes.
+        Returns (total_posts, successfully_deleted, failed_deletions).
+        """
+        thread_ids = await db.get_feed_posts(feed_id)
+        job_id = await db.create_cleanup_job(
+            feed_id, len(thread_ids), status_message.channel.id, status_message.id
+        )
+        return await self._spawn(job_id, status_message)
+
+    async def resume(self):
+        """Continue cleanup jobs that were interrupted by a restart."""
+        for job in await db.get_running_cleanup_jobs():
+            if job["id"] in self._jobs:
+                continue
+            logger.info(f"Resuming cleanup job {job['id']} for feed {job['feed_id']}")
+            status_message = self._get_status_message(job)
+            self._spawn(job["id"], status_message, resumed=True)
+
+    def _spawn(self, job_id: int, status_message, resumed: bool = False) -> asyncio.Task:
+        task = asyncio.create_task(self._run(job_id, status_message, resumed))
+        self._jobs[job_id] = task
+        task.add_done_callback(lambda _: self._jobs.pop(job_id, None))
+        return task
+
+    def _get_status_message(self, job) -> discord.PartialMessage | None:
+        if not job["status_channel_id"] or not job["status_message_id"]:
+            return None
+        channel = self.bot.get_channel(job["status_channel_id"])
+        if channel is None or not hasattr(channel, "get_partial_message"):
+            return None
+        return channel.get_partial_message(job["status_message_id"])
+
+    async def _run(self, job_id: int, status_message, resumed: bool) -> tuple[int, int, int]:
+        job = await db.get_cleanup_job(job_id)
+        feed_id = job["feed_id"]
+        total = job["total"]
+        deleted = job["deleted"]
+        failed = 0
+        last_report = 0.0
+
+        feed_info = await db.get_feed_info(feed_id)
+        feed_display = (feed_info[0] or feed_info[1]) if feed_info else str(feed_id)
+
+        thread_ids = iter(await db.get_feed_posts(feed_id))
+
+        async def worker():
+            nonlocal deleted, failed, last_report
+            # Workers share one iterator, so each thread is handled exactly once
+            for thread_id in thread_ids:
+                if await self._delete_thread(thread_id):
+                    deleted += 1
+                    await db.delete_feed_post(feed_id, thread_id)
+                else:
+                    failed += 1
+                await db.update_cleanup_progress(job_id, deleted, failed)
+
+                now = time.monotonic()
+                if now - last_report >= PROGRESS_INTERVAL_SECONDS:
+                    last_report = now
+                    await self._report(
+                        status_message,
+                        f"🧹 Cleaning up forum posts... ({deleted + failed}/{total} processed)",
+                    )
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+        await db.remove_feed(feed_id)
+        metrics.FEED_LAST_SUCCESS.remove(feed_id=str(feed_id))
+        await db.finish_cleanup_job(job_id)
+
+        if failed > 0:
+            result_msg = f"✅ Successfully removed {deleted} posts, {failed} posts failed to delete"
+        else:
+            result_msg = f"✅ Successfully removed all {deleted} posts"
+        if resumed:
+            result_msg += f"\n✅ Feed **{feed_display}** removed successfully."
+        await self._report(status_message, result_msg)
+
+        logger.info(f"Cleanup job {job_id} for feed '{feed_display}' finished: {deleted} deleted, {failed} failed")
+        return total, deleted, failed
+
+    async def _delete_thread(self, thread_id: int) -> bool:
+        """Delete one thread, retrying rate limits and server errors. Returns True if it is gone."""
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                thread = self.bot.get_channel(thread_id)
+                if thread is None:
+                    # Delete by ID instead of paying a fetch_channel round trip first
+                    await self.bot.http.delete_channel(thread_id)
+                elif isinstance(thread, discord.Thread):
+                    await thread.delete()
+                else:
+                    logger.warning(f"Channel {thread_id} is not a thread")
+                    return False
+                logger.debug(f"Deleted thread {thread_id}")
+                return True
+            except discord.NotFound:
+                # Thread was already deleted manually
+                logger.debug(f"Thread {thread_id} already deleted")
+                return True
+            except discord.Forbidden:
+                logger.warning(f"No permission to delete thread {thread_id}")
+                return False
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    metrics.RATE_LIMITED.inc(operation="delete_thread")
+                if not is_retryable(e) or attempt == MAX_ATTEMPTS:
+                    logger.error(f"Error deleting thread {thread_id}: {e}")
+                    return False
+                await asyncio.sleep(max(backoff_delay(attempt), getattr(e, "retry_after", 0) or 0))
+            except Exception as e:
+                logger.error(f"Error deleting thread {thread_id}: {e}")
+                return False
+        return False
+
+    async def _report(self, status_message, content: str):
+        if status_message is None:
+            return
+        try:
+            await status_message.edit(content=content)
+        except discord.HTTPException as e:
+            logger.debug(f"Failed to update cleanup status message: {e}")
@@ -1,7 +1,13 @@
+import io
+import discord
 from discord.ext import commands
+from bot import profiler
 from bot.config import get_owner_id
 
 
+MAX_PROFILE_SECONDS = 300
+
+
 class AddFlags(commands.FlagConverter):
     left: int = commands.flag(default=0, description="Number on the left")
     right: int = commands.flag(default=0, description="Number on the right")
@@ -25,3 +31,28 @@ def setup_basic(bot: commands.Bot):
 
         await bot.tree.sync()
         await ctx.send("Command tree synced.")
+
+    @bot.command()
+    async def profile(ctx, seconds: int = 30):
+        """Samples the running bot and replies with a report and collapsed stacks."""
+        if ctx.author.id != get_owner_id():
+            await ctx.send("You must be the owner to use this command!")
+            return
+        if profiler.is_running():
+            await ctx.send("A profile is already running.")
+            return
+
+        seconds = max(1, min(seconds, MAX_PROFILE_SECONDS))
+        await ctx.send(f"Profiling for {seconds} seconds...")
+        result = await profiler.run_profile(seconds)
+        report = result.report()
+        summary = report.split("\n\nTop functions by total")[0]
+        if len(summary) > 1900:
+            summary = summary[:1900].rsplit("\n", 1)[0]
+        await ctx.send(
+            f"```\n{summary}\n```",
+            files=[
+                discord.File(io.BytesIO(report.encode()), filename="profile.txt"),
+                discord.File(io.BytesIO(result.collapsed().encode()), filename="profile.collapsed"),
+            ],
+        )
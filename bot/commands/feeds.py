@@ -1,7 +1,83 @@
 from discord.ext import commands
+from discord import app_commands
 import discord
 import asyncio
-from bot import db
+import io
+import time
+from typing import Literal, Optional
+from bot import db, metrics
+from bot.config import get_digest_window_minutes, get_failure_threshold, get_retention_days
+from bot.opml import MAX_OPML_BYTES, FeedImporter, build_opml, parse_opml
+
+
+# Feeds shown per /listfeeds page; keeps a page well inside the message limit
+FEEDS_PER_PAGE = 15
+# Minimum time between edits of the /importopml status message
+IMPORT_PROGRESS_SECONDS = 3.0
+
+
+class AddFeedFlags(commands.FlagConverter):
+    # Positional, so `!addfeed #forum <url> Some Name` keeps working without `name:`
+    name: Optional[str] = commands.flag(default=None, positional=True, description="Name shown for the feed")
+    mode: Literal["single", "digest"] = commands.flag(
+        default="single",
+        description="single posts every article on its own, digest collects them into one post per window",
+    )
+
+
+async def render_feed_page(guild_id: int, page: int, total: int) -> str:
+    pages = max(1, -(-total // FEEDS_PER_PAGE))
+    feeds = await db.get_feeds_with_display_numbers(guild_id, page * FEEDS_PER_PAGE, FEEDS_PER_PAGE)
+    msg = "\n".join(
+        f"**[{display_number}]** {(name or url)[:100]} → <#{forum_channel_id}>"
+        for display_number, feed_id, forum_channel_id, url, name in feeds
+    )
+    return f"Configured feeds (page {page + 1}/{pages}, {total} total):\n{msg}"
+
+
+class FeedListView(discord.ui.View):
+    """Previous/next buttons for /listfeeds; each page is queried when it is shown."""
+
+    def __init__(self, author_id: int, guild_id: int, total: int):
+        super().__init__(timeout=300)
+        self.author_id = author_id
+        self.guild_id = guild_id
+        self.total = total
+        self.page = 0
+        self.pages = max(1, -(-total // FEEDS_PER_PAGE))
+        self.message: discord.Message | None = None
+        self._update_buttons()
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Only the person who ran the command can page through it.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        self.page = min(max(page, 0), self.pages - 1)
+        self._update_buttons()
+        content = await render_feed_page(self.guild_id, self.page, self.total)
+        await interaction.response.edit_message(content=content, view=self)
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.pages - 1
+
+    async def on_timeout(self):
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
 
 
 def setup_feeds(bot: commands.Bot):
@@ -14,14 +90,22 @@ def setup_feeds(bot: commands.Bot):
         forum_channel: discord.ForumChannel,
         url: str,
         *,
-        name: str | None = None,
+        flags: AddFeedFlags,
     ):
         if ctx.guild is None:
             return
 
-        await db.add_feed(ctx.guild.id, forum_channel.id, url, name)
+        name, post_mode = flags.name, flags.mode
+        await db.add_feed(ctx.guild.id, forum_channel.id, url, name, post_mode)
         feed_display = name if name else url
-        await ctx.send(f"Feed added: `{feed_display}` → {forum_channel.mention}")
+        if post_mode == "digest":
+            window = get_digest_window_minutes()
+            await ctx.send(
+                f"Feed added: `{feed_display}` → {forum_channel.mention}, "
+                f"new articles are collected into one post every {window} minutes"
+            )
+        else:
+            await ctx.send(f"Feed added: `{feed_display}` → {forum_channel.mention}")
 
     @bot.hybrid_command(name="removefeed", description="Remove a feed by its display number")
     @commands.has_permissions(administrator=True)
@@ -69,22 +153,15 @@ def setup_feeds(bot: commands.Bot):
                 await ctx.send("❌ Feed removal cancelled.")
                 return
             
-            # Start cleanup process
+            # Start cleanup process; the cleanup job also removes the feed and
+            # resumes on its own if the bot restarts before it is finished
             if post_count > 0:
                 cleanup_msg = await ctx.send(f"🧹 Cleaning up forum posts... ({post_count} posts to remove)")
-                
-                total, success, failed = await db.cleanup_feed_posts(feed_id, ctx.bot)
-                
-                # Update cleanup message with results
-                if failed > 0:
-                    result_msg = f"✅ Successfully removed {success} posts, {failed} posts failed to delete"
-                else:
-                    result_msg = f"✅ Successfully removed all {success} posts"
-                
-                await cleanup_msg.edit(content=result_msg)
+                await ctx.bot.cleanup_manager.remove_feed(feed_id, cleanup_msg)
+            else:
+                await db.remove_feed(feed_id)
+                metrics.FEED_LAST_SUCCESS.remove(feed_id=str(feed_id))
             
-            # Remove the feed from database
-            await db.remove_feed(feed_id)
             await ctx.send(f"✅ Feed **{feed_display}** removed successfully.")
             
         except asyncio.TimeoutError:
@@ -97,14 +174,164 @@ def setup_feeds(bot: commands.Bot):
     async def listfeeds(ctx: commands.Context[commands.Bot]):
         if ctx.guild is None:
             return
-        feeds = await db.get_feeds_with_display_numbers(ctx.guild.id)
+        total = await db.count_feeds(ctx.guild.id)
+        if not total:
+            await ctx.send("No RSS feeds configured for this server.")
+            return
+
+        content = await render_feed_page(ctx.guild.id, 0, total)
+        if total <= FEEDS_PER_PAGE:
+            await ctx.send(content)
+            return
+
+        view = FeedListView(ctx.author.id, ctx.guild.id, total)
+        view.message = await ctx.send(content, view=view)
+
+    @bot.hybrid_command(
+        name="brokenfeeds", description="List feeds whose recent polls failed"
+    )
+    @commands.has_permissions(administrator=True)
+    async def brokenfeeds(ctx: commands.Context[commands.Bot]):
+        if ctx.guild is None:
+            return
+        feeds = await db.get_failing_feeds(ctx.guild.id)
+        if not feeds:
+            await ctx.send("✅ All feeds are polling fine.")
+            return
+
+        threshold = get_failure_threshold()
+        lines = []
+        for feed in feeds:
+            status = "🔴" if feed["consecutive_failures"] >= threshold else "🟡"
+            next_try = f", next try <t:{int(feed['retry_after'])}:R>" if feed["retry_after"] else ""
+            error = (feed["last_error"] or "unknown error")[:150].replace("`", "'")
+            lines.append(
+                f"{status} **[{feed['display_number']}]** {feed['name'] or feed['url']} — "
+                f"{feed['consecutive_failures']} failures{next_try}\n    `{error}`"
+            )
+
+        msg = "Feeds with failing polls:"
+        for shown, line in enumerate(lines):
+            # Stay within Discord's message limit
+            if len(msg) + len(line) + 40 > 2000:
+                msg += f"\n…and {len(lines) - shown} more"
+                break
+            msg += "\n" + line
+
+        await ctx.send(msg)
+
+    @bot.hybrid_command(
+        name="retention", description="Set how long a feed's forum posts stay active"
+    )
+    @app_commands.describe(
+        days="archive and lock posts older than this many days, 0 keeps them forever",
+        posts="only keep this many of the feed's newest posts active",
+    )
+    @commands.has_permissions(administrator=True)
+    async def retention(
+        ctx: commands.Context[commands.Bot],
+        display_number: int,
+        days: Optional[int] = None,
+        posts: Optional[int] = None,
+    ):
+        if ctx.guild is None:
+            return
+        if (days is not None and days < 0) or (posts is not None and posts < 1):
+            await ctx.send("❌ Days must be 0 or more and posts at least 1.")
+            return
+
+        feed_info = await db.get_feed_by_display_number(ctx.guild.id, display_number)
+        if not feed_info:
+            await ctx.send(f"❌ Feed `{display_number}` not found.")
+            return
+        feed_id, forum_channel_id, url, name = feed_info
+        feed_display = name if name else url
+
+        await db.set_feed_retention(feed_id, days, posts)
+        limits = []
+        if days is None:
+            default_days = get_retention_days()
+            if default_days:
+                limits.append(f"older than {default_days} days (the default)")
+        elif days:
+            limits.append(f"older than {days} days")
+        if posts:
+            limits.append(f"beyond the newest {posts}")
+        if limits:
+            await ctx.send(f"✅ Posts of **{feed_display}** {' or '.join(limits)} will be archived and locked.")
+        else:
+            await ctx.send(f"✅ Posts of **{feed_display}** stay active.")
+
+    @bot.hybrid_command(
+        name="importopml", description="Import feeds from an OPML file into a forum channel"
+    )
+    @commands.has_permissions(administrator=True)
+    async def importopml(
+        ctx: commands.Context[commands.Bot],
+        forum_channel: discord.ForumChannel,
+        file: discord.Attachment,
+    ):
+        if ctx.guild is None:
+            return
+        if file.size > MAX_OPML_BYTES:
+            await ctx.send(f"❌ The file is too large (limit is {MAX_OPML_BYTES // 1024} KB).")
+            return
+        try:
+            outlines = parse_opml(await file.read())
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+        if not outlines:
+            await ctx.send("❌ The file contains no feeds.")
+            return
+
+        status_message = await ctx.send(f"📥 Checking {len(outlines)} feeds...")
+        last_report = time.monotonic()
+
+        async def on_progress(done: int, total: int):
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report < IMPORT_PROGRESS_SECONDS:
+                return
+            last_report = now
+            try:
+                await status_message.edit(content=f"📥 Checking feeds... ({done}/{total} checked)")
+            except discord.HTTPException:
+                pass
+
+        result = await FeedImporter().run(ctx.guild.id, forum_channel.id, outlines, on_progress)
+
+        msg = f"✅ Imported {len(result.added)} feeds into {forum_channel.mention}"
+        if result.duplicates:
+            msg += f", skipped {len(result.duplicates)} already added"
+        if result.failed:
+            msg += f"\n❌ {len(result.failed)} feeds failed:"
+            for shown, (url, reason) in enumerate(result.failed):
+                line = f"\n• <{url[:200]}> — {reason[:150]}"
+                # Stay within Discord's message limit
+                if len(msg) + len(line) + 40 > 2000:
+                    msg += f"\n…and {len(result.failed) - shown} more"
+                    break
+                msg += line
+        try:
+            await status_message.edit(content=msg)
+        except discord.HTTPException:
+            await ctx.send(msg)
+
+    @bot.hybrid_command(
+        name="exportopml", description="Export this server's feeds as an OPML file"
+    )
+    @commands.has_permissions(administrator=True)
+    async def exportopml(ctx: commands.Context[commands.Bot]):
+        if ctx.guild is None:
+            return
+        feeds = await db.list_feeds(ctx.guild.id)
         if not feeds:
             await ctx.send("No RSS feeds configured for this server.")
             return
 
-        msg = "\n".join(
-            f"**[{display_number}]** {name or url} → <#{forum_channel_id}>"
-            for display_number, feed_id, forum_channel_id, url, name in feeds
+        data = build_opml(((feed["url"], feed["name"]) for feed in feeds), f"{ctx.guild.name} feeds")
+        await ctx.send(
+            f"📤 Exported {len(feeds)} feeds.",
+            file=discord.File(io.BytesIO(data), filename="feeds.opml"),
         )
-
-        await ctx.send(f"Configured feeds:\n{msg}")
@@ -4,6 +4,13 @@ from dotenv import load_dotenv
 _ = load_dotenv()
 
 
+def _get_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if not value:
+        return default
+    return int(value)
+
+
 def get_token():
     token = os.getenv("token")
     if not token:
@@ -19,7 +26,176 @@ def get_owner_id():
 
 
 def get_poll_interval():
-    interval = os.getenv("POLL_INTERVAL_MINUTES")
-    if not interval:
-        return 15
-    return int(interval)
+    return _get_int("POLL_INTERVAL_MINUTES", 15)
+
+
+def get_max_concurrent_fetches():
+    return _get_int("MAX_CONCURRENT_FETCHES", 20)
+
+
+def get_max_fetches_per_host():
+    return _get_int("MAX_FETCHES_PER_HOST", 2)
+
+
+def get_fetch_timeout():
+    return _get_int("FETCH_TIMEOUT_SECONDS", 20)
+
+
+def get_max_feed_bytes():
+    return _get_int("MAX_FEED_BYTES", 10 * 1024 * 1024)
+
+
+def get_min_poll_interval():
+    return _get_int("MIN_POLL_INTERVAL_MINUTES", 5)
+
+
+def get_max_poll_interval():
+    return _get_int("MAX_POLL_INTERVAL_MINUTES", 24 * 60)
+
+
+def get_scheduler_tick():
+    return _get_int("SCHEDULER_TICK_SECONDS", 30)
+
+
+def get_failure_threshold():
+    """Consecutive failed polls after which a feed is reported as broken."""
+    return _get_int("FEED_FAILURE_THRESHOLD", 5)
+
+
+def get_startup_stagger():
+    """Seconds over which feeds that are overdue at startup are spread out."""
+    return _get_int("STARTUP_STAGGER_SECONDS", 120)
+
+
+def get_seen_entry_retention_days():
+    return _get_int("SEEN_ENTRY_RETENTION_DAYS", 90)
+
+
+def get_max_posting_lanes():
+    return _get_int("MAX_POSTING_LANES", 10)
+
+
+def get_parse_workers():
+    return _get_int("PARSE_WORKERS", 0)
+
+
+def get_cleanup_concurrency():
+    return _get_int("CLEANUP_CONCURRENCY", 5)
+
+
+def get_import_concurrency():
+    return _get_int("IMPORT_CONCURRENCY", 10)
+
+
+def get_fetch_cache_seconds():
+    return _get_int("FETCH_CACHE_SECONDS", 60)
+
+
+def get_streaming_parse():
+    """Stop downloading a feed once the last posted entry was read; off unless set to 1."""
+    return _get_int("STREAMING_PARSE", 0) == 1
+
+
+def get_render_cache_size():
+    """Rendered summaries kept in memory, per parse worker."""
+    return _get_int("RENDER_CACHE_SIZE", 2048)
+
+
+def get_render_cache_path():
+    """SQLite file that keeps rendered summaries across restarts; unset keeps them in memory only."""
+    return os.getenv("RENDER_CACHE_PATH") or None
+
+
+def get_poller_mode():
+    """
+    "embedded" polls inside the bot process; "gateway" leaves polling to
+    separate `python -m bot.worker` processes and only posts their results.
+    """
+    mode = (os.getenv("POLLER_MODE") or "embedded").lower()
+    if mode not in ("embedded", "gateway"):
+        raise ValueError(f"Unknown POLLER_MODE {mode!r}, expected 'embedded' or 'gateway'")
+    return mode
+
+
+def get_digest_window_minutes():
+    """Length of the window whose entries a digest feed collects into one post."""
+    return _get_int("DIGEST_WINDOW_MINUTES", 60)
+
+
+def get_posting_backend():
+    """
+    "bot" creates forum posts as the bot user; "webhook" posts through one webhook
+    per forum channel, falling back to the bot where webhooks cannot be managed.
+    """
+    backend = (os.getenv("POSTING_BACKEND") or "bot").lower()
+    if backend not in ("bot", "webhook"):
+        raise ValueError(f"Unknown POSTING_BACKEND {backend!r}, expected 'bot' or 'webhook'")
+    return backend
+
+
+def get_feed_lease_seconds():
+    return _get_int("FEED_LEASE_SECONDS", 600)
+
+
+def get_lease_batch_size():
+    return _get_int("LEASE_BATCH_SIZE", 100)
+
+
+def get_outbox_poll_seconds():
+    return _get_int("OUTBOX_POLL_SECONDS", 2)
+
+
+def get_websub_callback_url():
+    """Public base URL hubs can reach the WebSub callback server at; unset disables WebSub."""
+    url = os.getenv("WEBSUB_CALLBACK_URL")
+    return url.rstrip("/") if url else None
+
+
+def get_websub_server(default: bool) -> bool:
+    """
+    Whether this process serves WebSub callbacks and sends subscription requests.
+    Only one process per callback URL should; the embedded poller does unless set
+    to 0, a worker only when set to 1.
+    """
+    return _get_int("WEBSUB_SERVER", int(default)) == 1
+
+
+def get_websub_host():
+    return os.getenv("WEBSUB_HOST") or "0.0.0.0"
+
+
+def get_websub_port():
+    return _get_int("WEBSUB_PORT", 8081)
+
+
+def get_websub_lease_seconds():
+    """Subscription lease asked of hubs; hubs may grant a shorter one."""
+    return _get_int("WEBSUB_LEASE_SECONDS", 7 * 86400)
+
+
+def get_websub_safety_interval():
+    """Minutes between safety polls of a feed whose hub pushes its updates."""
+    return _get_int("WEBSUB_SAFETY_INTERVAL_MINUTES", 6 * 60)
+
+
+def get_retention_days():
+    """Days forum posts are kept active, for feeds without a policy of their own; 0 keeps them forever."""
+    return _get_int("RETENTION_DAYS", 0)
+
+
+def get_retention_interval_minutes():
+    return _get_int("RETENTION_INTERVAL_MINUTES", 60)
+
+
+def get_retention_batch_size():
+    """Threads archived between pauses of a retention pass."""
+    return _get_int("RETENTION_BATCH_SIZE", 50)
+
+
+def get_metrics_port():
+    """Port for the /metrics endpoint; 0 disables it."""
+    return _get_int("METRICS_PORT", 0)
+
+
+def get_metrics_host():
+    return os.getenv("METRICS_HOST") or "127.0.0.1"
@@ -1,42 +1,371 @@
-from collections.abc import Iterable
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Iterable
+from contextlib import asynccontextmanager
 from sqlite3 import Row
 import aiosqlite
+from bot.metrics import DB_QUERY_SECONDS, timed
 
 DB_PATH = "feeds.db"
 
+# Batched writes are committed when this many are queued, or after this long
+WRITE_BATCH_SIZE = 200
+WRITE_FLUSH_SECONDS = 1.0
 
-async def init_db():
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS feeds (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id INTEGER NOT NULL,
-                forum_channel_id INTEGER NOT NULL,
-                url TEXT NOT NULL,
-                name TEXT DEFAULT NULL,
-                last_entry_id TEXT
-            )
-        """)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS feed_posts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                feed_id INTEGER NOT NULL,
-                thread_id INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (feed_id) REFERENCES feeds (id) ON DELETE CASCADE
-            )
-        """)
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+)
+
+logger = logging.getLogger(__name__)
+
+_connection: aiosqlite.Connection | None = None
+_writer: "BatchWriter | None" = None
+
+
+class BatchWriter:
+    """
+    Queues small writes and commits them together, one transaction per flush.
+    Writes queued together with write_group stay together even when a batch
+    has to be retried piece by piece.
+
+    The connection is shared with every other query, so all writes go either
+    through the batch or through transaction(), which take turns on the same
+    lock; otherwise one side's commit or rollback would end the other's work.
+    """
+
+    def __init__(self, db: aiosqlite.Connection):
+        self.db = db
+        # Each unit is a list of (sql, params) that must succeed or fail as a whole
+        self._pending: list[list[tuple[str, tuple]]] = []
+        self._pending_rows = 0
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_periodically())
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Hold the connection for writes outside the batch. What runs inside is
+        committed when the block ends, or rolled back if it raises.
+        """
+        async with self._lock:
+            await self.db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.db
+            except BaseException:
+                await self.db.rollback()
+                raise
+            await self.db.commit()
+
+    async def write(self, sql: str, params: tuple) -> None:
+        await self._queue([[(sql, params)]])
+
+    async def write_many(self, sql: str, params: Iterable[tuple]) -> None:
+        await self._queue([[(sql, row)] for row in params])
+
+    async def write_group(self, statements: Iterable[tuple[str, Iterable[tuple]]]) -> None:
+        """Queue (sql, rows) statements that are committed all together or not at all."""
+        unit = [(sql, row) for sql, rows in statements for row in rows]
+        if unit:
+            await self._queue([unit])
+
+    async def _queue(self, units: list[list[tuple[str, tuple]]]) -> None:
+        self._pending.extend(units)
+        self._pending_rows += sum(len(unit) for unit in units)
+        if self._pending_rows >= WRITE_BATCH_SIZE:
+            await self.flush()
+
+    @timed(DB_QUERY_SECONDS, operation="flush_writes")
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            self._pending_rows = 0
+
+            # Group consecutive statements so each runs as one executemany
+            groups: list[tuple[str, list[tuple]]] = []
+            for unit in pending:
+                for sql, params in unit:
+                    if groups and groups[-1][0] == sql:
+                        groups[-1][1].append(params)
+                    else:
+                        groups.append((sql, [params]))
+
+            if not await self._begin(pending):
+                return
+            try:
+                for sql, rows in groups:
+                    await self.db.executemany(sql, rows)
+                await self.db.commit()
+            except Exception as e:
+                # One bad row (e.g. a post for a feed that was just removed)
+                # must not lose the rest of the batch, so retry unit by unit
+                await self.db.rollback()
+                logger.warning(f"Batched write failed ({e}), retrying individually")
+                await self._write_individually(pending)
+
+    async def _write_individually(self, pending: list[list[tuple[str, tuple]]]) -> None:
+        if not await self._begin(pending):
+            return
+        try:
+            for unit in pending:
+                await self.db.execute("SAVEPOINT unit")
+                try:
+                    for sql, params in unit:
+                        await self.db.execute(sql, params)
+                except Exception as e:
+                    await self.db.execute("ROLLBACK TO unit")
+                    logger.error(f"Dropping failed database write: {e}")
+                await self.db.execute("RELEASE unit")
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            self._requeue(pending)
+            logger.warning(f"Could not commit batched writes ({e}), keeping them for the next flush")
+
+    async def _begin(self, pending: list[list[tuple[str, tuple]]]) -> bool:
+        """
+        Start the flush's transaction. When another process holds the write lock
+        past busy_timeout, the writes go back to the queue instead of being lost.
+        """
+        try:
+            await self.db.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            await self.db.rollback()
+            self._requeue(pending)
+            logger.warning(f"Could not start batched writes ({e}), keeping them for the next flush")
+            return False
+        return True
+
+    def _requeue(self, pending: list[list[tuple[str, tuple]]]) -> None:
+        self._pending[:0] = pending
+        self._pending_rows += sum(len(unit) for unit in pending)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(WRITE_FLUSH_SECONDS)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush batched database writes: {e}")
+
+
+def get_connection() -> aiosqlite.Connection:
+    if _connection is None:
+        raise RuntimeError("Database not initialized, call init_db() first")
+    return _connection
+
+
+def get_writer() -> BatchWriter:
+    if _writer is None:
+        raise RuntimeError("Database not initialized, call init_db() first")
+    return _writer
+
+
+def transaction():
+    """Write outside the batch, see BatchWriter.transaction. Must not call flush_writes inside."""
+    return get_writer().transaction()
+
+
+async def flush_writes() -> None:
+    """Commit any queued batched writes now. If the database is locked, they stay queued."""
+    if _writer is not None:
+        await _writer.flush()
+
+
+async def close_db() -> None:
+    global _connection, _writer
+    if _writer is not None:
+        await _writer.close()
+        _writer = None
+    if _connection is not None:
+        await _connection.close()
+        _connection = None
+
+
+async def init_db() -> int:
+    """Open the connection and bring the schema up to date. Returns how many migrations ran."""
+    global _connection, _writer
+    if _connection is None:
+        _connection = await aiosqlite.connect(DB_PATH)
+        _connection.row_factory = aiosqlite.Row
+        for pragma in PRAGMAS:
+            await _connection.execute(pragma)
+    if _writer is None:
+        _writer = BatchWriter(_connection)
+        _writer.start()
+
+    return await migrate_db(_connection)
+
+
+async def migrate_db(db: aiosqlite.Connection) -> int:
+    """
+    Apply the migrations newer than the database's user_version, in order. Each
+    runs in one transaction together with its version bump, so a crash midway
+    leaves the schema as it was. An up to date schema runs no DDL at all.
+    """
+    cursor = await db.execute("PRAGMA user_version")
+    (version,) = await cursor.fetchone()
+    await cursor.close()
+    
+    pending = MIGRATIONS[version:]
+    for number, migration in enumerate(pending, start=version + 1):
+        logger.info(f"Migrating database to schema version {number}")
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            await migration(db)
+            await db.execute(f"PRAGMA user_version = {number}")
+        except BaseException:
+            await db.rollback()
+            raise
         await db.commit()
-        await migrate_db(db)
+    return len(pending)
 
 
-async def migrate_db(db: aiosqlite.Connection):
+async def _migration_1_baseline(db: aiosqlite.Connection):
+    """
+    The schema as of the introduction of user_version. Databases from before
+    then may have any part of it already, so every step tolerates that.
+    """
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS feeds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            forum_channel_id INTEGER NOT NULL,
+            url TEXT NOT NULL,
+            name TEXT DEFAULT NULL,
+            last_entry_id TEXT,
+            etag TEXT DEFAULT NULL,
+            last_modified TEXT DEFAULT NULL,
+            poll_interval REAL DEFAULT NULL,
+            next_poll_at REAL DEFAULT NULL,
+            consecutive_failures INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT DEFAULT NULL,
+            retry_after REAL DEFAULT NULL
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS feed_posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            feed_id INTEGER NOT NULL,
+            thread_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (feed_id) REFERENCES feeds (id) ON DELETE CASCADE
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS seen_entries (
+            feed_id INTEGER NOT NULL,
+            entry_hash TEXT NOT NULL,
+            last_seen_at REAL NOT NULL,
+            PRIMARY KEY (feed_id, entry_hash),
+            FOREIGN KEY (feed_id) REFERENCES feeds (id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_seen_entries_last_seen ON seen_entries (last_seen_at)"
+    )
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS cleanup_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            feed_id INTEGER NOT NULL,
+            status_channel_id INTEGER,
+            status_message_id INTEGER,
+            total INTEGER NOT NULL DEFAULT 0,
+            deleted INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'running',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            feed_id INTEGER NOT NULL,
+            forum_channel_id INTEGER NOT NULL,
+            entry_id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            last_error TEXT DEFAULT NULL,
+            delivered_at REAL DEFAULT NULL,
+            UNIQUE (feed_id, entry_id),
+            FOREIGN KEY (feed_id) REFERENCES feeds (id) ON DELETE CASCADE
+        )
+    """)
+    
     try:
         await db.execute("ALTER TABLE feeds ADD COLUMN name TEXT DEFAULT NULL")
-        await db.commit()
     except Exception:
         pass
     
+    # HTTP validators for conditional GET
+    for column in ("etag", "last_modified"):
+        try:
+            await db.execute(f"ALTER TABLE feeds ADD COLUMN {column} TEXT DEFAULT NULL")
+        except Exception:
+            pass
+    
+    # Per-feed adaptive schedule (seconds / unix timestamp)
+    for column in ("poll_interval", "next_poll_at"):
+        try:
+            await db.execute(f"ALTER TABLE feeds ADD COLUMN {column} REAL DEFAULT NULL")
+        except Exception:
+            pass
+    
+    # Failure tracking (count / message / unix timestamp of the next attempt)
+    for column, definition in (
+        ("consecutive_failures", "INTEGER NOT NULL DEFAULT 0"),
+        ("last_error", "TEXT DEFAULT NULL"),
+        ("retry_after", "REAL DEFAULT NULL"),
+    ):
+        try:
+            await db.execute(f"ALTER TABLE feeds ADD COLUMN {column} {definition}")
+        except Exception:
+            pass
+    
+    # Worker leases (worker ID / unix timestamp)
+    for column, column_type in (("lease_owner", "TEXT"), ("lease_expires_at", "REAL")):
+        try:
+            await db.execute(f"ALTER TABLE feeds ADD COLUMN {column} {column_type} DEFAULT NULL")
+        except Exception:
+            pass
+    
+    # Delivery state of queued posts
+    for column, definition in (
+        ("status", "TEXT NOT NULL DEFAULT 'pending'"),
+        ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+        ("next_attempt_at", "REAL NOT NULL DEFAULT 0"),
+        ("last_error", "TEXT DEFAULT NULL"),
+        ("delivered_at", "REAL DEFAULT NULL"),
+    ):
+        try:
+            await db.execute(f"ALTER TABLE outbox ADD COLUMN {column} {definition}")
+        except Exception:
+            pass
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (next_attempt_at) WHERE status = 'pending'"
+    )
+    
     # Create feed_posts table if it doesn't exist (for existing installations)
     try:
         await db.execute("""
@@ -48,182 +377,777 @@ async def migrate_db(db: aiosqlite.Connection):
                 FOREIGN KEY (feed_id) REFERENCES feeds (id) ON DELETE CASCADE
             )
         """)
-        await db.commit()
     except Exception:
         pass
 
 
+async def _migration_2_lookup_indexes(db: aiosqlite.Connection):
+    # Per-guild listing and display numbers, and a feed's posts for cleanup
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_feeds_guild ON feeds (guild_id, id)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_feed_posts_feed ON feed_posts (feed_id)")
+
+
+async def _migration_3_websub(db: aiosqlite.Connection):
+    # One hub subscription per normalized feed URL, shared by every feed polling it
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS websub_subscriptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            feed_url TEXT NOT NULL UNIQUE,
+            hub_url TEXT NOT NULL,
+            topic_url TEXT NOT NULL,
+            secret TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            lease_expires_at REAL,
+            renew_at REAL NOT NULL DEFAULT 0,
+            last_error TEXT
+        )
+    """)
+
+
+async def _migration_4_post_mode(db: aiosqlite.Connection):
+    # "single" posts every entry as its own thread, "digest" collects them per window
+    await db.execute("ALTER TABLE feeds ADD COLUMN post_mode TEXT NOT NULL DEFAULT 'single'")
+
+
+async def _migration_5_webhooks(db: aiosqlite.Connection):
+    # The webhook each forum channel is posted through, when posting via webhooks
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS forum_webhooks (
+            forum_channel_id INTEGER PRIMARY KEY,
+            webhook_id INTEGER NOT NULL,
+            webhook_token TEXT NOT NULL
+        )
+    """)
+    # Feed image, used as the avatar of its webhook posts
+    await db.execute("ALTER TABLE feeds ADD COLUMN avatar_url TEXT DEFAULT NULL")
+
+
+async def _migration_6_retention(db: aiosqlite.Connection):
+    # Per-feed retention; NULL days falls back to RETENTION_DAYS, 0 keeps posts forever
+    await db.execute("ALTER TABLE feeds ADD COLUMN retention_days INTEGER DEFAULT NULL")
+    await db.execute("ALTER TABLE feeds ADD COLUMN retention_posts INTEGER DEFAULT NULL")
+    # Posts moved out of feed_posts by retention, still deleted when their feed is removed
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS feed_post_archive (
+            feed_id INTEGER NOT NULL,
+            thread_id INTEGER NOT NULL,
+            posted_at INTEGER,
+            archived_at REAL NOT NULL,
+            PRIMARY KEY (feed_id, thread_id),
+            FOREIGN KEY (feed_id) REFERENCES feeds (id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    # Finds a feed's posts past an age; the feed_id index keeps serving ID order
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_feed_posts_feed_created ON feed_posts (feed_id, created_at)")
+
+
+# Append new migrations here; a database's user_version is the number it has applied
+MIGRATIONS = [
+    _migration_1_baseline,
+    _migration_2_lookup_indexes,
+    _migration_3_websub,
+    _migration_4_post_mode,
+    _migration_5_webhooks,
+    _migration_6_retention,
+]
+
+
+@timed(DB_QUERY_SECONDS, operation="add_feed")
 async def add_feed(
-    guild_id: int, forum_channel_id: int, url: str, name: str | None = None
+    guild_id: int, forum_channel_id: int, url: str, name: str | None = None, post_mode: str = "single"
 ):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with transaction() as db:
         await db.execute(
-            "INSERT INTO feeds (guild_id, forum_channel_id, url, name) VALUES (?, ?, ?, ?)",
-            (guild_id, forum_channel_id, url, name),
+            "INSERT INTO feeds (guild_id, forum_channel_id, url, name, post_mode) VALUES (?, ?, ?, ?, ?)",
+            (guild_id, forum_channel_id, url, name, post_mode),
         )
-        await db.commit()
 
 
+@timed(DB_QUERY_SECONDS, operation="import_feeds")
+async def import_feeds(guild_id: int, forum_channel_id: int, feeds: Iterable[dict]) -> int:
+    """
+    Add several feeds in one transaction, each with its dedup state already seeded
+    so the first poll only posts what is published after the import. Every feed is
+    a dict with url, name, last_entry_id, etag, last_modified, next_poll_at and
+    entry_hashes. Returns the number of feeds added.
+    """
+    await flush_writes()
+    now = time.time()
+    added = 0
+    # Batched writes wait until the whole import is committed or rolled back
+    async with transaction() as db:
+        for feed in feeds:
+            cursor = await db.execute(
+                """
+                INSERT INTO feeds (guild_id, forum_channel_id, url, name, last_entry_id,
+                                   etag, last_modified, next_poll_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    guild_id, forum_channel_id, feed["url"], feed["name"], feed["last_entry_id"],
+                    feed["etag"], feed["last_modified"], feed["next_poll_at"],
+                ),
+            )
+            feed_id = cursor.lastrowid
+            await cursor.close()
+            await db.executemany(
+                MARK_SEEN_SQL, [(feed_id, entry_hash, now) for entry_hash in feed["entry_hashes"]]
+            )
+            added += 1
+    return added
+
+
+@timed(DB_QUERY_SECONDS, operation="remove_feed")
 async def remove_feed(feed_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+    await flush_writes()
+    async with transaction() as db:
         await db.execute("DELETE FROM feeds WHERE id = ?", (feed_id,))
-        await db.commit()
 
 
+@timed(DB_QUERY_SECONDS, operation="list_feeds")
 async def list_feeds(guild_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute(
-            "SELECT id, forum_channel_id, url, name FROM feeds WHERE guild_id = ?",
-            (guild_id,),
-        )
-        return await cursor.fetchall()
+    db = get_connection()
+    cursor = await db.execute(
+        "SELECT id, forum_channel_id, url, name FROM feeds WHERE guild_id = ? ORDER BY id",
+        (guild_id,),
+    )
+    return await cursor.fetchall()
 
 
+@timed(DB_QUERY_SECONDS, operation="get_all_feeds")
 async def get_all_feeds() -> Iterable[Row]:
-    async with aiosqlite.connect(DB_PATH) as db:
+    await flush_writes()
+    db = get_connection()
+    cursor = await db.execute(
+        """
+        SELECT id, forum_channel_id, url, name, last_entry_id, etag, last_modified,
+               poll_interval, next_poll_at, consecutive_failures, post_mode, avatar_url
+        FROM feeds
+        WHERE id NOT IN (SELECT feed_id FROM cleanup_jobs WHERE status = 'running')
+        """
+    )
+    rows = await cursor.fetchall()
+    await cursor.close()
+    return rows
+
+
+@timed(DB_QUERY_SECONDS, operation="claim_due_feeds")
+async def claim_due_feeds(owner: str, now: float, lease_until: float, limit: int) -> list[Row]:
+    """
+    Lease up to `limit` due feeds to a worker and return them like get_all_feeds.
+    Feeds leased by another worker are skipped until the lease expires, which is
+    how the feeds of a crashed worker are handed to the others.
+    """
+    await flush_writes()
+    async with transaction() as db:
         cursor = await db.execute(
-            "SELECT id, forum_channel_id, url, name, last_entry_id FROM feeds"
+            """
+            UPDATE feeds SET lease_owner = ?, lease_expires_at = ?
+            WHERE id IN (
+                SELECT id FROM feeds
+                WHERE COALESCE(next_poll_at, 0) <= ?
+                  AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+                  AND id NOT IN (SELECT feed_id FROM cleanup_jobs WHERE status = 'running')
+                ORDER BY COALESCE(next_poll_at, 0)
+                LIMIT ?
+            )
+            RETURNING id, forum_channel_id, url, name, last_entry_id, etag, last_modified,
+                      poll_interval, next_poll_at, consecutive_failures, post_mode, avatar_url
+            """,
+            (owner, lease_until, now, now, limit),
         )
         rows = await cursor.fetchall()
         await cursor.close()
-        return rows
+    return rows
 
 
-async def update_last_entry_id(feed_id: int, new_entry_id: str) -> None:
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            "UPDATE feeds SET last_entry_id = ? WHERE id = ?", (new_entry_id, feed_id)
-        )
-        await db.commit()
+@timed(DB_QUERY_SECONDS, operation="renew_feed_leases")
+async def renew_feed_leases(owner: str, lease_until: float) -> None:
+    await get_writer().write(
+        "UPDATE feeds SET lease_expires_at = ? WHERE lease_owner = ?", (lease_until, owner)
+    )
 
 
-async def record_feed_post(feed_id: int, thread_id: int) -> None:
-    """Record a forum post created by a feed for cleanup tracking."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            "INSERT INTO feed_posts (feed_id, thread_id) VALUES (?, ?)",
-            (feed_id, thread_id),
+@timed(DB_QUERY_SECONDS, operation="release_feed_leases")
+async def release_feed_leases(owner: str, feed_ids: Iterable[int]) -> None:
+    await get_writer().write_many(
+        "UPDATE feeds SET lease_owner = NULL, lease_expires_at = NULL WHERE id = ? AND lease_owner = ?",
+        [(feed_id, owner) for feed_id in feed_ids],
+    )
+
+
+@timed(DB_QUERY_SECONDS, operation="update_feed_schedules")
+async def update_feed_schedules(schedules: Iterable[tuple[int, float, float]]) -> None:
+    """Persist (feed_id, poll_interval, next_poll_at) for a batch of feeds."""
+    await get_writer().write_many(
+        "UPDATE feeds SET poll_interval = ?, next_poll_at = ? WHERE id = ?",
+        [(interval, next_poll_at, feed_id) for feed_id, interval, next_poll_at in schedules],
+    )
+
+
+@timed(DB_QUERY_SECONDS, operation="update_feed_failures")
+async def update_feed_failures(failures: Iterable[tuple[int, int, str | None, float | None]]) -> None:
+    """
+    Persist (feed_id, consecutive_failures, last_error, retry_after) for a batch of feeds.
+    A feed that recovered is stored with 0 failures and no error or retry time.
+    """
+    await get_writer().write_many(
+        "UPDATE feeds SET consecutive_failures = ?, last_error = ?, retry_after = ? WHERE id = ?",
+        [(count, error, retry_after, feed_id) for feed_id, count, error, retry_after in failures],
+    )
+
+
+@timed(DB_QUERY_SECONDS, operation="get_failing_feeds")
+async def get_failing_feeds(guild_id: int) -> list[Row]:
+    """
+    Feeds of a guild whose last poll failed, most failures first, with the same
+    display numbers as get_feeds_with_display_numbers.
+    """
+    await flush_writes()
+    db = get_connection()
+    cursor = await db.execute(
+        """
+        SELECT * FROM (
+            SELECT ROW_NUMBER() OVER (ORDER BY id) AS display_number, id, url, name,
+                   consecutive_failures, last_error, retry_after
+            FROM feeds WHERE guild_id = ?
         )
-        await db.commit()
+        WHERE consecutive_failures > 0
+        ORDER BY consecutive_failures DESC, display_number
+        """,
+        (guild_id,),
+    )
+    rows = await cursor.fetchall()
+    await cursor.close()
+    return rows
 
 
-async def get_feed_posts(feed_id: int) -> list[int]:
-    """Get all thread IDs for posts created by a specific feed."""
-    async with aiosqlite.connect(DB_PATH) as db:
+@timed(DB_QUERY_SECONDS, operation="get_seen_entries")
+async def get_seen_entries(feed_id: int, entry_hashes: list[str]) -> dict[str, float]:
+    """
+    Look up which of the given entry hashes were already seen for a feed.
+    Returns {entry_hash: last_seen_at} for the ones that were.
+    """
+    await flush_writes()
+    db = get_connection()
+    seen = {}
+    # Stay well below SQLite's bound parameter limit
+    for start in range(0, len(entry_hashes), 500):
+        chunk = entry_hashes[start:start + 500]
+        placeholders = ", ".join("?" for _ in chunk)
         cursor = await db.execute(
-            "SELECT thread_id FROM feed_posts WHERE feed_id = ?", (feed_id,)
+            f"SELECT entry_hash, last_seen_at FROM seen_entries "
+            f"WHERE feed_id = ? AND entry_hash IN ({placeholders})",
+            (feed_id, *chunk),
         )
-        rows = await cursor.fetchall()
+        seen.update((row[0], row[1]) for row in await cursor.fetchall())
         await cursor.close()
-        return [row[0] for row in rows]
+    return seen
 
 
-async def get_feed_info(feed_id: int) -> tuple[str, str] | None:
-    """Get feed name and URL for a specific feed ID."""
-    async with aiosqlite.connect(DB_PATH) as db:
+@timed(DB_QUERY_SECONDS, operation="has_seen_entries")
+async def has_seen_entries(feed_id: int) -> bool:
+    db = get_connection()
+    cursor = await db.execute(
+        "SELECT EXISTS (SELECT 1 FROM seen_entries WHERE feed_id = ?)", (feed_id,)
+    )
+    row = await cursor.fetchone()
+    await cursor.close()
+    return bool(row[0])
+
+
+MARK_SEEN_SQL = """
+    INSERT INTO seen_entries (feed_id, entry_hash, last_seen_at) VALUES (?, ?, ?)
+    ON CONFLICT (feed_id, entry_hash) DO UPDATE SET last_seen_at = excluded.last_seen_at
+"""
+
+
+@timed(DB_QUERY_SECONDS, operation="store_poll_results")
+async def store_poll_results(
+    feed_id: int,
+    forum_channel_id: int,
+    posts: list[tuple[str, str, str]],
+    seen_hashes: Iterable[str],
+    seen_at: float,
+    touch_seen: bool = False,
+    validators: tuple[str | None, str | None] | None = None,
+    digest: tuple[str, str, str, float] | None = None,
+    avatar_url: str | None = None,
+) -> None:
+    """
+    Queue a poll's new (entry_id, title, content) posts, oldest first, in the
+    outbox and record everything that depends on them in the same transaction:
+    the last entry ID, seen entries and HTTP validators. After a crash either
+    all of it was stored or none of it, so nothing is lost or posted twice.
+
+    touch_seen refreshes all of the feed's seen entries, for when only the top
+    of the feed was read and entries further down were not looked up.
+
+    With a digest, (entry_id, title, content, deliver_at), the posts are not
+    queued one by one; the digest is, or its content is added to the pending
+    digest with the same ID, and it is delivered once deliver_at has passed.
+
+    avatar_url replaces the feed's stored image when given.
+    """
+    statements = []
+    if posts and digest is not None:
+        statements.append((
+            """
+            INSERT INTO outbox (feed_id, forum_channel_id, entry_id, title, content, created_at, next_attempt_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (feed_id, entry_id) DO UPDATE SET content = content || char(10) || excluded.content
+            WHERE status = 'pending'
+            """,
+            [(feed_id, forum_channel_id, digest[0], digest[1], digest[2], seen_at, digest[3])],
+        ))
+    elif posts:
+        # An entry that is already queued is not queued twice
+        statements.append((
+            """
+            INSERT OR IGNORE INTO outbox (feed_id, forum_channel_id, entry_id, title, content, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [(feed_id, forum_channel_id, entry_id, title, content, seen_at) for entry_id, title, content in posts],
+        ))
+    if posts:
+        statements.append((
+            "UPDATE feeds SET last_entry_id = ? WHERE id = ?", [(posts[-1][0], feed_id)]
+        ))
+    if touch_seen:
+        statements.append((
+            "UPDATE seen_entries SET last_seen_at = ? WHERE feed_id = ?", [(seen_at, feed_id)]
+        ))
+    statements.append((MARK_SEEN_SQL, [(feed_id, entry_hash, seen_at) for entry_hash in seen_hashes]))
+    if validators is not None:
+        statements.append((
+            "UPDATE feeds SET etag = ?, last_modified = ? WHERE id = ?", [(*validators, feed_id)]
+        ))
+    if avatar_url is not None:
+        statements.append(("UPDATE feeds SET avatar_url = ? WHERE id = ?", [(avatar_url, feed_id)]))
+    await get_writer().write_group(statements)
+
+
+@timed(DB_QUERY_SECONDS, operation="prune_seen_entries")
+async def prune_seen_entries(older_than: float) -> int:
+    """Forget entries that have not appeared in their feed since the given timestamp."""
+    await flush_writes()
+    async with transaction() as db:
         cursor = await db.execute(
-            "SELECT name, url FROM feeds WHERE id = ?", (feed_id,)
+            "DELETE FROM seen_entries WHERE last_seen_at < ?", (older_than,)
+        )
+    return cursor.rowcount
+
+
+@timed(DB_QUERY_SECONDS, operation="delete_feed_post")
+async def delete_feed_post(feed_id: int, thread_id: int) -> None:
+    await get_writer().write_group([
+        ("DELETE FROM feed_posts WHERE feed_id = ? AND thread_id = ?", [(feed_id, thread_id)]),
+        ("DELETE FROM feed_post_archive WHERE feed_id = ? AND thread_id = ?", [(feed_id, thread_id)]),
+    ])
+
+
+@timed(DB_QUERY_SECONDS, operation="get_retention_policies")
+async def get_retention_policies(default_days: int) -> list[Row]:
+    """
+    Feeds with a retention policy, their own or default_days, that are not
+    being removed. Returns rows of id, retention_days and retention_posts.
+    """
+    db = get_connection()
+    cursor = await db.execute(
+        """
+        SELECT id, COALESCE(retention_days, ?) AS retention_days, retention_posts FROM feeds
+        WHERE (COALESCE(retention_days, ?) > 0 OR retention_posts > 0)
+          AND id NOT IN (SELECT feed_id FROM cleanup_jobs WHERE status = 'running')
+        ORDER BY id
+        """,
+        (default_days, default_days),
+    )
+    rows = await cursor.fetchall()
+    await cursor.close()
+    return rows
+
+
+@timed(DB_QUERY_SECONDS, operation="get_expired_feed_posts")
+async def get_expired_feed_posts(
+    feed_id: int, created_before: float | None, keep_newest: int | None, limit: int, after_id: int = 0
+) -> list[Row]:
+    """
+    A feed's oldest posts past its retention, from after_id on: made before
+    created_before, or not among its keep_newest most recent. Returns rows of
+    id and thread_id.
+    """
+    await flush_writes()
+    db = get_connection()
+    # Posts are numbered in the order they were made, so both limits become an ID cutoff
+    cutoff_id = 0
+    if keep_newest:
+        cursor = await db.execute(
+            "SELECT id FROM feed_posts WHERE feed_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+            (feed_id, keep_newest),
         )
         row = await cursor.fetchone()
         await cursor.close()
-        if row:
-            return row[0], row[1]  # name, url
-        return None
+        if row is not None:
+            cutoff_id = row[0]
+    if created_before is not None:
+        cursor = await db.execute(
+            "SELECT MAX(id) FROM feed_posts WHERE feed_id = ? AND created_at < datetime(?, 'unixepoch')",
+            (feed_id, created_before),
+        )
+        (expired_id,) = await cursor.fetchone()
+        await cursor.close()
+        cutoff_id = max(cutoff_id, expired_id or 0)
+    if not cutoff_id:
+        return []
+
+    cursor = await db.execute(
+        "SELECT id, thread_id FROM feed_posts WHERE feed_id = ? AND id > ? AND id <= ? ORDER BY id LIMIT ?",
+        (feed_id, after_id, cutoff_id, limit),
+    )
+    rows = await cursor.fetchall()
+    await cursor.close()
+    return rows
 
 
-async def get_feeds_with_display_numbers(guild_id: int) -> list[tuple[int, int, int, str, str | None]]:
+@timed(DB_QUERY_SECONDS, operation="archive_feed_posts")
+async def archive_feed_posts(archived: Iterable[int], forgotten: Iterable[int], archived_at: float) -> None:
     """
-    Get feeds with sequential display numbers (1, 2, 3...).
-    Returns list of (display_number, feed_id, forum_channel_id, url, name) tuples.
+    Move feed_posts rows, by ID, to feed_post_archive, and drop the rows of
+    threads that no longer exist, together.
     """
-    async with aiosqlite.connect(DB_PATH) as db:
+    archived, forgotten = list(archived), list(forgotten)
+    await get_writer().write_group([
+        (
+            """
+            INSERT OR IGNORE INTO feed_post_archive (feed_id, thread_id, posted_at, archived_at)
+            SELECT feed_id, thread_id, CAST(strftime('%s', created_at) AS INTEGER), ? FROM feed_posts WHERE id = ?
+            """,
+            [(archived_at, post_id) for post_id in archived],
+        ),
+        ("DELETE FROM feed_posts WHERE id = ?", [(post_id,) for post_id in archived + forgotten]),
+    ])
+
+
+@timed(DB_QUERY_SECONDS, operation="set_feed_retention")
+async def set_feed_retention(feed_id: int, days: int | None, posts: int | None) -> None:
+    async with transaction() as db:
+        await db.execute(
+            "UPDATE feeds SET retention_days = ?, retention_posts = ? WHERE id = ?", (days, posts, feed_id)
+        )
+
+
+@timed(DB_QUERY_SECONDS, operation="get_due_outbox")
+async def get_due_outbox(now: float, limit: int) -> list[Row]:
+    """Undelivered posts whose next attempt is due, oldest first."""
+    await flush_writes()
+    db = get_connection()
+    cursor = await db.execute(
+        """
+        SELECT outbox.id, feed_id, outbox.forum_channel_id, entry_id, title, content, attempts,
+               feeds.name AS feed_name, feeds.url AS feed_url, feeds.avatar_url
+        FROM outbox JOIN feeds ON feeds.id = outbox.feed_id
+        WHERE status = 'pending' AND next_attempt_at <= ?
+          AND feed_id NOT IN (SELECT feed_id FROM cleanup_jobs WHERE status = 'running')
+        ORDER BY outbox.id LIMIT ?
+        """,
+        (now, limit),
+    )
+    rows = await cursor.fetchall()
+    await cursor.close()
+    return rows
+
+
+@timed(DB_QUERY_SECONDS, operation="mark_outbox_delivered")
+async def mark_outbox_delivered(outbox_id: int, feed_id: int, thread_id: int) -> None:
+    """Mark a queued post delivered and record its thread for cleanup, together."""
+    await get_writer().write_group([
+        ("INSERT INTO feed_posts (feed_id, thread_id) VALUES (?, ?)", [(feed_id, thread_id)]),
+        (
+            """
+            UPDATE outbox SET status = 'delivered', attempts = attempts + 1,
+                              delivered_at = ?, last_error = NULL
+            WHERE id = ?
+            """,
+            [(time.time(), outbox_id)],
+        ),
+    ])
+
+
+@timed(DB_QUERY_SECONDS, operation="mark_outbox_failed")
+async def mark_outbox_failed(outbox_id: int, error: str, retry_at: float | None) -> None:
+    """Record a failed delivery; with no retry_at the post is given up on."""
+    await get_writer().write(
+        """
+        UPDATE outbox SET status = ?, attempts = attempts + 1, next_attempt_at = COALESCE(?, next_attempt_at),
+                          last_error = ?
+        WHERE id = ?
+        """,
+        ("pending" if retry_at is not None else "failed", retry_at, error, outbox_id),
+    )
+
+
+@timed(DB_QUERY_SECONDS, operation="prune_outbox")
+async def prune_outbox(older_than: float) -> int:
+    """Forget delivered and abandoned posts queued before the given timestamp."""
+    await flush_writes()
+    async with transaction() as db:
         cursor = await db.execute(
-            "SELECT id, forum_channel_id, url, name FROM feeds WHERE guild_id = ? ORDER BY id",
-            (guild_id,),
+            "DELETE FROM outbox WHERE status != 'pending' AND created_at < ?", (older_than,)
         )
-        feeds = await cursor.fetchall()
-        await cursor.close()
-        
-        # Add sequential display numbers starting from 1
-        return [
-            (display_num, feed_id, forum_channel_id, url, name)
-            for display_num, (feed_id, forum_channel_id, url, name) in enumerate(feeds, start=1)
-        ]
+    return cursor.rowcount
 
 
-async def get_feed_by_display_number(guild_id: int, display_number: int) -> tuple[int, int, str, str | None] | None:
+@timed(DB_QUERY_SECONDS, operation="save_websub_subscription")
+async def save_websub_subscription(feed_url: str, hub_url: str, topic_url: str, secret: str) -> None:
     """
-    Get feed info by display number (1-based).
-    Returns (feed_id, forum_channel_id, url, name) or None if not found.
+    Remember a hub advertised by a feed. A subscription to a different hub or
+    topic starts over as pending; an unchanged one is left alone.
     """
-    feeds_with_numbers = await get_feeds_with_display_numbers(guild_id)
-    
-    for display_num, feed_id, forum_channel_id, url, name in feeds_with_numbers:
-        if display_num == display_number:
-            return feed_id, forum_channel_id, url, name
-    
+    await get_writer().write(
+        """
+        INSERT INTO websub_subscriptions (feed_url, hub_url, topic_url, secret) VALUES (?, ?, ?, ?)
+        ON CONFLICT (feed_url) DO UPDATE SET
+            hub_url = excluded.hub_url, topic_url = excluded.topic_url, secret = excluded.secret,
+            status = 'pending', lease_expires_at = NULL, renew_at = 0, last_error = NULL
+        WHERE hub_url != excluded.hub_url OR topic_url != excluded.topic_url
+        """,
+        (feed_url, hub_url, topic_url, secret),
+    )
+
+
+@timed(DB_QUERY_SECONDS, operation="get_websub_subscriptions")
+async def get_websub_subscriptions() -> list[Row]:
+    await flush_writes()
+    db = get_connection()
+    cursor = await db.execute(
+        "SELECT id, feed_url, hub_url, topic_url, secret, status, lease_expires_at FROM websub_subscriptions"
+    )
+    rows = await cursor.fetchall()
+    await cursor.close()
+    return rows
+
+
+@timed(DB_QUERY_SECONDS, operation="get_websub_subscription")
+async def get_websub_subscription(subscription_id: int) -> Row | None:
+    await flush_writes()
+    db = get_connection()
+    cursor = await db.execute(
+        """
+        SELECT id, feed_url, hub_url, topic_url, secret, status, lease_expires_at
+        FROM websub_subscriptions WHERE id = ?
+        """,
+        (subscription_id,),
+    )
+    row = await cursor.fetchone()
+    await cursor.close()
+    return row
+
+
+@timed(DB_QUERY_SECONDS, operation="claim_websub_renewals")
+async def claim_websub_renewals(now: float, retry_at: float, limit: int) -> list[Row]:
+    """
+    Take the subscriptions whose (re)subscribe request is due, pushing their next
+    attempt to retry_at. Claiming in one statement keeps several worker processes
+    from sending the same request.
+    """
+    await flush_writes()
+    async with transaction() as db:
+        cursor = await db.execute(
+            """
+            UPDATE websub_subscriptions SET renew_at = ?
+            WHERE id IN (SELECT id FROM websub_subscriptions WHERE renew_at <= ? ORDER BY renew_at LIMIT ?)
+            RETURNING id, feed_url, hub_url, topic_url, secret, status
+            """,
+            (retry_at, now, limit),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+    return rows
+
+
+@timed(DB_QUERY_SECONDS, operation="activate_websub_subscription")
+async def activate_websub_subscription(subscription_id: int, lease_expires_at: float, renew_at: float) -> None:
+    await get_writer().write(
+        """
+        UPDATE websub_subscriptions SET status = 'active', lease_expires_at = ?, renew_at = ?, last_error = NULL
+        WHERE id = ?
+        """,
+        (lease_expires_at, renew_at, subscription_id),
+    )
+
+
+@timed(DB_QUERY_SECONDS, operation="fail_websub_subscription")
+async def fail_websub_subscription(subscription_id: int, status: str, error: str, renew_at: float | None = None) -> None:
+    """Record a refused or failed subscription; renew_at moves the next attempt if given."""
+    await get_writer().write(
+        """
+        UPDATE websub_subscriptions SET status = ?, last_error = ?, renew_at = COALESCE(?, renew_at)
+        WHERE id = ?
+        """,
+        (status, error, renew_at, subscription_id),
+    )
+
+
+@timed(DB_QUERY_SECONDS, operation="delete_websub_subscriptions")
+async def delete_websub_subscriptions(subscription_ids: Iterable[int]) -> None:
+    await get_writer().write_many(
+        "DELETE FROM websub_subscriptions WHERE id = ?",
+        [(subscription_id,) for subscription_id in subscription_ids],
+    )
+
+
+@timed(DB_QUERY_SECONDS, operation="get_forum_webhook")
+async def get_forum_webhook(forum_channel_id: int) -> Row | None:
+    await flush_writes()
+    db = get_connection()
+    cursor = await db.execute(
+        "SELECT webhook_id, webhook_token FROM forum_webhooks WHERE forum_channel_id = ?",
+        (forum_channel_id,),
+    )
+    row = await cursor.fetchone()
+    await cursor.close()
+    return row
+
+
+@timed(DB_QUERY_SECONDS, operation="save_forum_webhook")
+async def save_forum_webhook(forum_channel_id: int, webhook_id: int, webhook_token: str) -> None:
+    await get_writer().write(
+        "INSERT OR REPLACE INTO forum_webhooks (forum_channel_id, webhook_id, webhook_token) VALUES (?, ?, ?)",
+        (forum_channel_id, webhook_id, webhook_token),
+    )
+
+
+@timed(DB_QUERY_SECONDS, operation="delete_forum_webhook")
+async def delete_forum_webhook(forum_channel_id: int) -> None:
+    await get_writer().write("DELETE FROM forum_webhooks WHERE forum_channel_id = ?", (forum_channel_id,))
+
+
+@timed(DB_QUERY_SECONDS, operation="get_feed_posts")
+async def get_feed_posts(feed_id: int) -> list[int]:
+    """Get all thread IDs for posts created by a specific feed, archived ones included."""
+    await flush_writes()
+    db = get_connection()
+    cursor = await db.execute(
+        """
+        SELECT thread_id FROM feed_posts WHERE feed_id = ?
+        UNION ALL SELECT thread_id FROM feed_post_archive WHERE feed_id = ?
+        """,
+        (feed_id, feed_id),
+    )
+    rows = await cursor.fetchall()
+    await cursor.close()
+    return [row[0] for row in rows]
+
+
+@timed(DB_QUERY_SECONDS, operation="get_feed_info")
+async def get_feed_info(feed_id: int) -> tuple[str, str] | None:
+    """Get feed name and URL for a specific feed ID."""
+    db = get_connection()
+    cursor = await db.execute(
+        "SELECT name, url FROM feeds WHERE id = ?", (feed_id,)
+    )
+    row = await cursor.fetchone()
+    await cursor.close()
+    if row:
+        return row[0], row[1]  # name, url
     return None
 
 
-async def cleanup_feed_posts(feed_id: int, bot) -> tuple[int, int, int]:
+@timed(DB_QUERY_SECONDS, operation="get_feeds_with_display_numbers")
+async def get_feeds_with_display_numbers(
+    guild_id: int, offset: int = 0, limit: int = -1
+) -> list[tuple[int, int, int, str, str | None]]:
     """
-    Clean up forum posts for a feed and return statistics.
-    Returns (total_posts, successfully_deleted, failed_deletions).
+    Get feeds with sequential display numbers (1, 2, 3...), optionally one page of them.
+    Returns list of (display_number, feed_id, forum_channel_id, url, name) tuples.
     """
-    import logging
-    import discord
+    db = get_connection()
+    cursor = await db.execute(
+        "SELECT id, forum_channel_id, url, name FROM feeds WHERE guild_id = ? ORDER BY id LIMIT ? OFFSET ?",
+        (guild_id, limit, offset),
+    )
+    feeds = await cursor.fetchall()
+    await cursor.close()
     
-    logger = logging.getLogger(__name__)
-    
-    # Get all thread IDs for this feed
-    thread_ids = await get_feed_posts(feed_id)
-    total_posts = len(thread_ids)
-    successfully_deleted = 0
-    failed_deletions = 0
-    
-    if not thread_ids:
-        return 0, 0, 0
-    
-    for thread_id in thread_ids:
-        try:
-            # Try to get the thread from Discord
-            thread = bot.get_channel(thread_id)
-            if thread is None:
-                # Try to fetch if not in cache
-                try:
-                    thread = await bot.fetch_channel(thread_id)
-                except discord.NotFound:
-                    # Thread was already deleted manually
-                    logger.debug(f"Thread {thread_id} already deleted")
-                    successfully_deleted += 1
-                    continue
-                except discord.Forbidden:
-                    logger.warning(f"No permission to access thread {thread_id}")
-                    failed_deletions += 1
-                    continue
-                except Exception as e:
-                    logger.error(f"Error fetching thread {thread_id}: {e}")
-                    failed_deletions += 1
-                    continue
-            
-            # Delete the thread
-            if isinstance(thread, discord.Thread):
-                await thread.delete()
-                successfully_deleted += 1
-                logger.debug(f"Deleted thread {thread_id}")
-            else:
-                logger.warning(f"Channel {thread_id} is not a thread")
-                failed_deletions += 1
-                
-        except discord.NotFound:
-            # Thread was already deleted
-            successfully_deleted += 1
-        except discord.Forbidden:
-            logger.warning(f"No permission to delete thread {thread_id}")
-            failed_deletions += 1
-        except Exception as e:
-            logger.error(f"Error deleting thread {thread_id}: {e}")
-            failed_deletions += 1
+    # Add sequential display numbers starting from 1
+    return [
+        (display_num, feed_id, forum_channel_id, url, name)
+        for display_num, (feed_id, forum_channel_id, url, name) in enumerate(feeds, start=offset + 1)
+    ]
+
+
+@timed(DB_QUERY_SECONDS, operation="count_feeds")
+async def count_feeds(guild_id: int) -> int:
+    db = get_connection()
+    cursor = await db.execute("SELECT COUNT(*) FROM feeds WHERE guild_id = ?", (guild_id,))
+    (count,) = await cursor.fetchone()
+    await cursor.close()
+    return count
+
+
+@timed(DB_QUERY_SECONDS, operation="get_feed_by_display_number")
+async def get_feed_by_display_number(guild_id: int, display_number: int) -> tuple[int, int, str, str | None] | None:
+    """
+    Get feed info by display number (1-based).
+    Returns (feed_id, forum_channel_id, url, name) or None if not found.
+    """
+    if display_number < 1:
+        return None
     
-    # Clean up database records (this will happen automatically with CASCADE)
-    return total_posts, successfully_deleted, failed_deletions
+    # Walks the (guild_id, id) index instead of loading the guild's feeds
+    db = get_connection()
+    cursor = await db.execute(
+        "SELECT id, forum_channel_id, url, name FROM feeds WHERE guild_id = ? ORDER BY id LIMIT 1 OFFSET ?",
+        (guild_id, display_number - 1),
+    )
+    row = await cursor.fetchone()
+    await cursor.close()
+    return tuple(row) if row else None
+
+
+@timed(DB_QUERY_SECONDS, operation="create_cleanup_job")
+async def create_cleanup_job(
+    feed_id: int, total: int, status_channel_id: int | None, status_message_id: int | None
+) -> int:
+    """Persist a feed removal so it can resume after a restart. Returns the job ID."""
+    async with transaction() as db:
+        cursor = await db.execute(
+            """
+            INSERT INTO cleanup_jobs (feed_id, status_channel_id, status_message_id, total)
+            VALUES (?, ?, ?, ?)
+            """,
+            (feed_id, status_channel_id, status_message_id, total),
+        )
+    return cursor.lastrowid
+
+
+@timed(DB_QUERY_SECONDS, operation="get_cleanup_job")
+async def get_cleanup_job(job_id: int) -> Row | None:
+    db = get_connection()
+    cursor = await db.execute("SELECT * FROM cleanup_jobs WHERE id = ?", (job_id,))
+    row = await cursor.fetchone()
+    await cursor.close()
+    return row
+
+
+@timed(DB_QUERY_SECONDS, operation="get_running_cleanup_jobs")
+async def get_running_cleanup_jobs() -> list[Row]:
+    db = get_connection()
+    cursor = await db.execute("SELECT * FROM cleanup_jobs WHERE status = 'running' ORDER BY id")
+    rows = await cursor.fetchall()
+    await cursor.close()
+    return rows
+
+
+@timed(DB_QUERY_SECONDS, operation="update_cleanup_progress")
+async def update_cleanup_progress(job_id: int, deleted: int, failed: int) -> None:
+    await get_writer().write(
+        "UPDATE cleanup_jobs SET deleted = ?, failed = ? WHERE id = ?", (deleted, failed, job_id)
+    )
+
+
+@timed(DB_QUERY_SECONDS, operation="finish_cleanup_job")
+async def finish_cleanup_job(job_id: int) -> None:
+    await flush_writes()
+    async with transaction() as db:
+        await db.execute("UPDATE cleanup_jobs SET status = 'done' WHERE id = ?", (job_id,))
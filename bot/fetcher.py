@@ -0,0 +1,168 @@
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from urllib.parse import urlsplit, urlunsplit
+import aiohttp
+from bot.config import (
+    get_fetch_timeout,
+    get_max_concurrent_fetches,
+    get_max_feed_bytes,
+    get_max_fetches_per_host,
+)
+
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "DiscoRSS (+https://github.com/erom03/DiscoRSS)"
+ACCEPT = "application/rss+xml, application/atom+xml, application/rdf+xml, application/xml;q=0.9, text/xml;q=0.9, */*;q=0.1"
+CHUNK_SIZE = 64 * 1024
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class FeedTooLarge(Exception):
+    pass
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a feed URL, used to spot subscriptions to the same feed.
+    Lower-cases scheme and host, drops default ports and fragments.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    if parts.username:
+        credentials = parts.username + (f":{parts.password}" if parts.password else "")
+        host = f"{credentials}@{host}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+class TTLCache:
+    """Small in-memory cache whose entries expire after a fixed number of seconds."""
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+    def get(self, key: str):
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        stored_at, value = item
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        return value
+
+    def put(self, key: str, value) -> None:
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+@dataclass
+class FetchResult:
+    status: int
+    body: bytes
+    headers: dict[str, str]
+    # The caller's on_chunk callback stopped the download before the end
+    stopped_early: bool = False
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+    @property
+    def etag(self) -> str | None:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> str | None:
+        return self.headers.get("last-modified")
+
+
+class FeedFetcher:
+    """Pooled HTTP client that downloads raw feed documents."""
+
+    def __init__(self):
+        self.timeout = aiohttp.ClientTimeout(total=get_fetch_timeout())
+        self.max_bytes = get_max_feed_bytes()
+        self._session: aiohttp.ClientSession | None = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=get_max_concurrent_fetches(),
+                limit_per_host=get_max_fetches_per_host(),
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={"User-Agent": USER_AGENT, "Accept": ACCEPT},
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def fetch(
+        self,
+        url: str,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        on_chunk: Callable[[bytes], bool] | None = None,
+    ) -> FetchResult:
+        """
+        Download a feed document, conditionally if validators are given.
+        Header names in the result are lower-cased; a 304 result has an empty body.
+
+        With on_chunk, the body is handed over piece by piece instead of being
+        collected, and the download stops as soon as on_chunk returns True.
+        """
+        request_headers = {}
+        if etag:
+            request_headers["If-None-Match"] = etag
+        if last_modified:
+            request_headers["If-Modified-Since"] = last_modified
+
+        session = self._get_session()
+        async with session.get(url, headers=request_headers) as response:
+            headers = {key.lower(): value for key, value in response.headers.items()}
+            # feedparser resolves relative links against content-location
+            headers["content-location"] = str(response.url)
+
+            if response.status == 304:
+                return FetchResult(response.status, b"", headers)
+
+            response.raise_for_status()
+
+            if response.content_length and response.content_length > self.max_bytes:
+                raise FeedTooLarge(f"{response.content_length} bytes exceeds limit of {self.max_bytes}")
+
+            body = bytearray()
+            received = 0
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                received += len(chunk)
+                if received > self.max_bytes:
+                    raise FeedTooLarge(f"body exceeds limit of {self.max_bytes} bytes")
+                if on_chunk is None:
+                    body.extend(chunk)
+                elif on_chunk(chunk):
+                    # Leaving the block with unread data closes this connection
+                    return FetchResult(response.status, b"", headers, stopped_early=True)
+
+            return FetchResult(response.status, bytes(body), headers)
@@ -1,10 +1,19 @@
+import time
+
+# Taken before the remaining imports so the startup report includes them
+STARTED = time.perf_counter()
+
 import discord
 import asyncio
 import logging
 from discord.ext import commands
-from bot.config import get_token
+from bot.config import get_metrics_host, get_metrics_port, get_poller_mode, get_token
 from bot import db
+from bot.cleanup import CleanupManager
 from bot.commands import register_all_commands
+from bot.metrics import MetricsServer
+from bot.outbox import OutboxDrainer
+from bot.retention import RetentionManager
 from bot.rss_poller import RSSPoller
 
 logging.basicConfig(level=logging.INFO)
@@ -19,6 +28,10 @@ bot = commands.Bot(
 )
 
 rss_poller = None
+outbox_drainer = None
+retention_manager = None
+# Seconds spent in each startup phase, reported once the bot is ready
+startup_timings: dict[str, float] = {"imports": time.perf_counter() - STARTED}
 
 
 @bot.event
@@ -26,21 +39,57 @@ async def on_ready():
     print(f"Logged in as {bot.user} (ID: {bot.user.id})")
     print("------")
     
-    global rss_poller
-    rss_poller = RSSPoller(bot)
-    rss_poller.start_polling()
-    print(f"RSS polling started")
+    # on_ready fires again after every reconnect; everything below only runs once
+    global rss_poller, outbox_drainer, retention_manager
+    if outbox_drainer is not None:
+        return
+    
+    # Posts always go out through the outbox, which also resumes any left by a restart
+    outbox_drainer = OutboxDrainer(bot)
+    outbox_drainer.start()
+    if get_poller_mode() == "gateway":
+        # Feeds are polled by `python -m bot.worker` processes
+        print("Posting from the outbox, polling is left to workers")
+    else:
+        rss_poller = RSSPoller(bot, outbox_drainer)
+        rss_poller.start_polling()
+        print(f"RSS polling started")
+    
+    await bot.cleanup_manager.resume()
+    retention_manager = RetentionManager(bot)
+    retention_manager.start()
+    
+    startup_timings["gateway"] = time.perf_counter() - STARTED - sum(startup_timings.values())
+    print(
+        f"Ready {time.perf_counter() - STARTED:.2f}s after start "
+        f"({', '.join(f'{phase} {seconds:.2f}s' for phase, seconds in startup_timings.items())})"
+    )
 
 
 async def setup():
-    await db.init_db()
+    started = time.perf_counter()
+    migrations = await db.init_db()
+    startup_timings[f"database ({migrations} migrations)"] = time.perf_counter() - started
+    bot.cleanup_manager = CleanupManager(bot)
     register_all_commands(bot)
+    
+    metrics_server = None
+    if get_metrics_port():
+        metrics_server = MetricsServer(get_metrics_host(), get_metrics_port())
+        await metrics_server.start()
 
     try:
         await bot.start(get_token())
     finally:
         if rss_poller:
-            rss_poller.stop_polling()
+            await rss_poller.close()
+        if outbox_drainer:
+            await outbox_drainer.close()
+        if retention_manager:
+            await retention_manager.close()
+        if metrics_server:
+            await metrics_server.stop()
+        await db.close_db()
 
 
 asyncio.run(setup())
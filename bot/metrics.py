@@ -0,0 +1,240 @@
+"""
+Prometheus-style metrics and the local HTTP endpoint that serves them.
+
+Metrics are module-level objects, like loggers, so any module can record to
+them without passing anything around. Nothing here needs a client library;
+render() produces the text exposition format directly.
+"""
+import asyncio
+import functools
+import logging
+import math
+import time
+from collections.abc import Callable
+from aiohttp import web
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, value in self._values.items():
+            lines.append(f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def remove(self, **labels) -> None:
+        self._values.pop(self._key(labels), None)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the (unlabelled) value when metrics are scraped."""
+        self._function = function
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        if self._function is not None:
+            try:
+                lines.append(f"{self.name} {_format_value(self._function())}")
+            except Exception as e:
+                logger.debug(f"Gauge {self.name} callback failed: {e}")
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            # [bucket counts..., sum, count]
+            series = [0] * len(self.buckets) + [0.0, 0]
+            self._series[key] = series
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def time(self, **labels) -> "_Timer":
+        """Context manager that observes the elapsed time of its block."""
+        return _Timer(self, labels)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, series in self._series.items():
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += series[index]
+                le = 'le="' + ("+Inf" if math.isinf(bound) else repr(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+def timed(histogram: Histogram, **labels):
+    """Decorator that observes how long each call of a coroutine function takes."""
+    def decorator(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return await function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+REGISTRY: list[_Metric] = []
+
+FETCH_SECONDS = Histogram("discorss_fetch_seconds", "Time to download a feed document.", ("host",))
+FETCH_RESULTS = Counter("discorss_fetches", "Feed downloads by result.", ("result",))
+PARSE_SECONDS = Histogram("discorss_parse_seconds", "Time feedparser spends on a feed document.")
+RENDER_SECONDS = Histogram("discorss_render_seconds", "Time spent converting a feed's entries to Markdown.")
+RENDER_CACHE = Counter("discorss_render_cache", "Rendered summary cache lookups by result.", ("result",))
+DB_QUERY_SECONDS = Histogram("discorss_db_query_seconds", "Database call latency.", ("operation",))
+POSTING_QUEUE_DEPTH = Gauge("discorss_posting_queue_depth", "Forum posts waiting to be sent.")
+POSTS = Counter("discorss_posts", "Forum posts by result.", ("result",))
+WEBSUB_NOTIFICATIONS = Counter("discorss_websub_notifications", "WebSub content notifications by result.", ("result",))
+RETAINED_POSTS = Counter("discorss_retained_posts", "Forum posts handled by retention, by result.", ("result",))
+RATE_LIMITED = Counter("discorss_rate_limited", "Discord responses that were rate limited (429).", ("operation",))
+CYCLE_SECONDS = Histogram(
+    "discorss_cycle_seconds", "Duration of a poll cycle.",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 900, 1800, 3600),
+)
+POLL_INTERVAL_SECONDS = Gauge("discorss_poll_interval_seconds", "Configured base poll interval.")
+SCHEDULED_FEEDS = Gauge("discorss_scheduled_feeds", "Feeds known to the poll scheduler.")
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "discorss_event_loop_lag_seconds", "How late the event loop runs a task that asked to wake up.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+FEED_LAST_SUCCESS = Gauge(
+    "discorss_feed_last_success_timestamp_seconds", "When each feed was last fetched successfully.", ("feed_id",)
+)
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves /metrics over HTTP and samples event-loop lag while running."""
+
+    LAG_SAMPLE_SECONDS = 0.5
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._runner: web.AppRunner | None = None
+        self._lag_task: asyncio.Task | None = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._lag_task = asyncio.create_task(self._sample_loop_lag())
+        logger.info(f"Metrics available at http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=render().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    async def _sample_loop_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.LAG_SAMPLE_SECONDS
+            await asyncio.sleep(self.LAG_SAMPLE_SECONDS)
+            EVENT_LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - expected))
@@ -0,0 +1,153 @@
+"""
+OPML import and export of a guild's feeds.
+
+Imported feeds are validated before anything is written: each one is
+fetched and parsed, with a bounded number in flight. The valid ones are
+then added in the file's order in one transaction, with the entries they
+have now already marked as seen. A migrated reader therefore starts with
+new articles only and does not post 15 old ones per feed.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from xml.etree import ElementTree
+from bot import db
+from bot.config import get_import_concurrency, get_poll_interval
+from bot.fetcher import FeedFetcher, normalize_url
+from bot.parsing import entry_key, parse_entry_ids
+
+
+logger = logging.getLogger(__name__)
+
+# Largest OPML file accepted for import
+MAX_OPML_BYTES = 2 * 1024 * 1024
+
+
+@dataclass
+class Outline:
+    url: str
+    title: str | None = None
+
+
+@dataclass
+class ImportResult:
+    added: list[str] = field(default_factory=list)
+    duplicates: list[str] = field(default_factory=list)
+    # (url, reason) for each feed that did not validate
+    failed: list[tuple[str, str]] = field(default_factory=list)
+
+
+def parse_opml(data: bytes) -> list[Outline]:
+    """Every outline with an xmlUrl, at any depth, in document order. Raises ValueError if unreadable."""
+    try:
+        root = ElementTree.fromstring(data)
+    except ElementTree.ParseError as e:
+        raise ValueError(f"not a valid OPML file: {e}") from e
+    if root.tag != "opml":
+        raise ValueError("not an OPML file")
+
+    outlines = []
+    for element in root.iter("outline"):
+        url = (element.get("xmlUrl") or "").strip()
+        if url:
+            title = element.get("title") or element.get("text")
+            outlines.append(Outline(url, title.strip() if title else None))
+    return outlines
+
+
+def build_opml(feeds, title: str) -> bytes:
+    """An OPML document for (url, name) pairs."""
+    root = ElementTree.Element("opml", version="2.0")
+    head = ElementTree.SubElement(root, "head")
+    ElementTree.SubElement(head, "title").text = title
+    body = ElementTree.SubElement(root, "body")
+    for url, name in feeds:
+        ElementTree.SubElement(body, "outline", type="rss", text=name or url, title=name or url, xmlUrl=url)
+    ElementTree.indent(root)
+    return ElementTree.tostring(root, encoding="utf-8", xml_declaration=True)
+
+
+class FeedImporter:
+    """Validates outlines against the live feeds and imports the ones that work."""
+
+    def __init__(self, concurrency: int | None = None):
+        self.concurrency = concurrency or get_import_concurrency()
+        self.poll_interval = get_poll_interval() * 60
+
+    async def run(
+        self,
+        guild_id: int,
+        forum_channel_id: int,
+        outlines: list[Outline],
+        on_progress: Callable[[int, int], Awaitable[None]] | None = None,
+    ) -> ImportResult:
+        result = ImportResult()
+
+        # Skip feeds this channel already has, and repeats within the file
+        known = {
+            normalize_url(row["url"])
+            for row in await db.list_feeds(guild_id)
+            if row["forum_channel_id"] == forum_channel_id
+        }
+        pending = []
+        for outline in outlines:
+            key = normalize_url(outline.url)
+            if key in known:
+                result.duplicates.append(outline.url)
+            else:
+                known.add(key)
+                pending.append(outline)
+
+        fetcher = FeedFetcher()
+        slots = asyncio.Semaphore(self.concurrency)
+        # Outline position -> feed, so the feeds are added in the file's order
+        validated: dict[int, dict] = {}
+        done = 0
+
+        async def validate(index: int, outline: Outline):
+            nonlocal done
+            async with slots:
+                try:
+                    validated[index] = await self._validate(fetcher, outline)
+                except Exception as e:
+                    result.failed.append((outline.url, str(e) or type(e).__name__))
+            done += 1
+            if on_progress is not None:
+                await on_progress(done, len(pending))
+
+        try:
+            await asyncio.gather(*(validate(index, outline) for index, outline in enumerate(pending)))
+        finally:
+            await fetcher.close()
+
+        # First polls are spread over one interval instead of all landing at once
+        now = time.time()
+        feeds = [validated[index] for index in sorted(validated)]
+        for feed in feeds:
+            feed["next_poll_at"] = now + random.uniform(0, self.poll_interval)
+        await db.import_feeds(guild_id, forum_channel_id, feeds)
+        result.added = [feed["url"] for feed in feeds]
+        logger.info(
+            f"Imported {len(result.added)} feeds into channel {forum_channel_id}, "
+            f"{len(result.duplicates)} duplicates, {len(result.failed)} failed"
+        )
+        return result
+
+    async def _validate(self, fetcher: FeedFetcher, outline: Outline) -> dict:
+        response = await fetcher.fetch(outline.url)
+        loop = asyncio.get_running_loop()
+        # Only the entry IDs are needed, so nothing is rendered
+        version, entry_ids = await loop.run_in_executor(None, parse_entry_ids, response.body, response.headers)
+        if not version and not entry_ids:
+            raise ValueError("not an RSS or Atom feed")
+        return {
+            "url": outline.url,
+            "name": outline.title,
+            "last_entry_id": entry_ids[0] if entry_ids else None,
+            "etag": response.etag,
+            "last_modified": response.last_modified,
+            "entry_hashes": {entry_key(entry_id) for entry_id in entry_ids},
+        }
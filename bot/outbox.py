@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+import discord
+from discord.ext import tasks
+from bot import db, metrics
+from bot.config import get_max_posting_lanes, get_outbox_poll_seconds, get_posting_backend
+from bot.parsing import split_message
+from bot.posting import PostingQueue, is_retryable
+from bot.profiler import stage
+from bot.webhooks import WebhookManager, webhook_username
+
+
+logger = logging.getLogger(__name__)
+
+# Queued posts read from the outbox per pass
+OUTBOX_BATCH_SIZE = 200
+# A post that keeps failing is given up after this many deliveries
+MAX_DELIVERY_ATTEMPTS = 8
+RETRY_BASE_SECONDS = 60.0
+RETRY_MAX_SECONDS = 3600.0
+
+
+class OutboxDrainer:
+    """
+    Delivers the posts that polling queued in the outbox table.
+
+    Due rows are read in ID order and submitted to the posting queue, which
+    keeps each channel in order and retries short-lived errors itself. A row
+    is marked delivered together with its feed_posts record; a post that still
+    fails is retried on a later pass with a growing delay. Rows left pending
+    by a restart are picked up again when the drainer starts.
+    """
+
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+        webhooks = WebhookManager(bot) if get_posting_backend() == "webhook" else None
+        self.posting_queue = PostingQueue(get_max_posting_lanes(), webhooks)
+        # Outbox rows handed to the posting queue and not settled yet
+        self._in_flight: set[int] = set()
+        self._deliveries: set[asyncio.Task] = set()
+        self._draining = asyncio.Lock()
+        self._wake_task: asyncio.Task | None = None
+
+        metrics.POSTING_QUEUE_DEPTH.set_function(lambda: self.posting_queue.depth)
+
+    def start(self):
+        self.drain.change_interval(seconds=get_outbox_poll_seconds())
+        self.drain.start()
+        logger.info("Outbox drainer started")
+
+    def wake(self):
+        """Look for due posts now instead of at the next pass."""
+        if self._wake_task is None or self._wake_task.done():
+            self._wake_task = asyncio.create_task(self.drain_once())
+
+    async def close(self):
+        if self.drain.is_running():
+            self.drain.cancel()
+        if self._wake_task is not None:
+            self._wake_task.cancel()
+        for delivery in self._deliveries:
+            delivery.cancel()
+        await self.posting_queue.close()
+
+    async def join(self):
+        """Wait until every submitted post was delivered or failed."""
+        while self._deliveries:
+            await asyncio.gather(*self._deliveries, return_exceptions=True)
+
+    @tasks.loop(seconds=2)
+    async def drain(self):
+        await self.drain_once()
+
+    async def drain_once(self) -> int:
+        """Submit every due post. Returns how many were submitted."""
+        submitted = 0
+        try:
+            async with self._draining:
+                while True:
+                    # Taken before the query: a post settling while it runs has its row
+                    # read as still pending, but is in this snapshot
+                    in_flight = set(self._in_flight)
+                    rows = await db.get_due_outbox(time.time(), OUTBOX_BATCH_SIZE + len(in_flight))
+                    rows = [row for row in rows if row["id"] not in in_flight]
+                    for row in rows:
+                        self._submit(row)
+                    submitted += len(rows)
+                    if len(rows) < OUTBOX_BATCH_SIZE:
+                        break
+        except Exception as e:
+            logger.error(f"Error draining outbox: {e}")
+        return submitted
+
+    def _submit(self, row):
+        self._in_flight.add(row["id"])
+        delivery = asyncio.create_task(self._deliver(row))
+        self._deliveries.add(delivery)
+        delivery.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, row):
+        try:
+            forum_channel = self.bot.get_channel(row["forum_channel_id"])
+            if not isinstance(forum_channel, discord.ForumChannel):
+                # Could be a channel the gateway has not seen yet, so it gets retried
+                raise LookupError(f"forum channel {row['forum_channel_id']} not found")
+            # Digests can outgrow one message; the rest follows inside the thread
+            content, *follow_ups = split_message(row["content"])
+            with stage("post"):
+                thread = await self.posting_queue.submit(
+                    forum_channel,
+                    row["title"],
+                    content,
+                    follow_ups,
+                    username=webhook_username(row["feed_name"], row["feed_url"]),
+                    avatar_url=row["avatar_url"],
+                )
+        except asyncio.CancelledError:
+            # Shutting down, the row stays pending for the next start
+            raise
+        except Exception as e:
+            await self._record_failure(row, e)
+        else:
+            await db.mark_outbox_delivered(row["id"], row["feed_id"], thread.id)
+            logger.debug(f"Created forum post: {row['title']}")
+        finally:
+            self._in_flight.discard(row["id"])
+
+    async def _record_failure(self, row, error: Exception):
+        attempts = row["attempts"] + 1
+        permanent = isinstance(error, discord.HTTPException) and not is_retryable(error)
+        if permanent or attempts >= MAX_DELIVERY_ATTEMPTS:
+            logger.error(
+                f"Giving up on forum post for entry '{row['title']}' after {attempts} attempts: {error}"
+            )
+            await db.mark_outbox_failed(row["id"], str(error), None)
+            return
+        delay = retry_delay(attempts)
+        logger.warning(
+            f"Failed to create forum post for entry '{row['title']}', retrying in {delay:.0f}s: {error}"
+        )
+        await db.mark_outbox_failed(row["id"], str(error), time.time() + delay)
+
+    @drain.before_loop
+    async def before_drain(self):
+        await self.bot.wait_until_ready()
+
+
+def retry_delay(attempt: int) -> float:
+    return min(RETRY_BASE_SECONDS * 2 ** (attempt - 1), RETRY_MAX_SECONDS)
@@ -0,0 +1,371 @@
+"""
+Feed parsing and post rendering.
+
+Everything here is plain functions over picklable data so it can run in a
+worker process; the poller sends the raw document in and gets compact
+EntryRecords back instead of full feedparser objects.
+
+feedparser and markdownify (with BeautifulSoup) are imported on first use,
+as they are slow to import and not needed to bring the bot online.
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from bot.config import get_render_cache_path, get_render_cache_size
+from bot.scheduler import feed_interval_hint, publish_gap
+
+
+logger = logging.getLogger(__name__)
+
+# Discord's limit for a message, which is what a forum post's content is
+MAX_MESSAGE_LENGTH = 2000
+# HTML longer than this many times the Markdown budget is cut before conversion;
+# markup rarely makes up more than that share of a summary
+HTML_BUDGET_FACTOR = 4
+# Persisted renders are dropped after this long
+RENDER_CACHE_MAX_AGE = 30 * 86400
+PRUNE_EVERY_PUTS = 1000
+
+
+@dataclass(slots=True)
+class EntryRecord:
+    id: str
+    title: str
+    link: str | None
+    content: str
+    published: str | None
+
+
+@dataclass(slots=True)
+class ParsedFeed:
+    entries: list[EntryRecord] = field(default_factory=list)
+    bozo: bool = False
+    interval_hint: float | None = None
+    publish_gap: float | None = None
+    parse_seconds: float = 0.0
+    render_seconds: float = 0.0
+    # feedparser's name for the format, e.g. "rss20" or "atom10"; empty if unknown
+    version: str = ""
+    # True when the streaming parser stopped before the end of the document
+    partial: bool = False
+    # WebSub hub and topic (rel="self") URLs the feed advertises
+    hub: str | None = None
+    topic: str | None = None
+    # The feed's image or icon, if it has one
+    image: str | None = None
+    render_cache_hits: int = 0
+    render_cache_misses: int = 0
+
+
+class RenderCache:
+    """
+    Rendered Markdown keyed by a hash of the source HTML and the length budget.
+
+    An LRU in memory, optionally backed by a SQLite file that outlives restarts
+    and is shared by parse worker processes. The cache is best effort: a
+    failing SQLite tier is logged and otherwise ignored.
+    """
+
+    def __init__(self, max_entries: int, path: str | None = None):
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        # Renders run in the default thread pool when there are no parse workers
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._puts = 0
+
+    @staticmethod
+    def key(html_content: str, budget: int) -> str:
+        digest = hashlib.blake2b(html_content.encode("utf-8", "surrogatepass"), digest_size=16)
+        return f"{budget}:{digest.hexdigest()}"
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            elif self.path:
+                value = self._load(key)
+                if value is not None:
+                    self._remember(key, value)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._remember(key, value)
+            if self.path:
+                self._store(key, value)
+
+    def _remember(self, key: str, value: str) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute("PRAGMA synchronous = NORMAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS render_cache (
+                    key TEXT PRIMARY KEY,
+                    markdown TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            self._db.commit()
+        return self._db
+
+    def _load(self, key: str) -> str | None:
+        try:
+            row = self._connection().execute(
+                "SELECT markdown FROM render_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Render cache lookup failed: {e}")
+            return None
+        return row[0] if row else None
+
+    def _store(self, key: str, value: str) -> None:
+        try:
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO render_cache (key, markdown, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._puts += 1
+            if self._puts % PRUNE_EVERY_PUTS == 0:
+                db.execute(
+                    "DELETE FROM render_cache WHERE created_at < ?", (time.time() - RENDER_CACHE_MAX_AGE,)
+                )
+            db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Render cache write failed: {e}")
+
+
+_render_cache: RenderCache | None = None
+
+
+def get_render_cache() -> RenderCache:
+    # Created on first use, so every parse worker process builds its own
+    global _render_cache
+    if _render_cache is None:
+        _render_cache = RenderCache(get_render_cache_size(), get_render_cache_path())
+    return _render_cache
+
+
+def parse_feed(body: bytes, headers: dict[str, str]) -> ParsedFeed:
+    """Parse a feed document and render every entry into a ready-to-post record."""
+    import feedparser
+
+    started = time.perf_counter()
+    parsed = feedparser.parse(body, response_headers=headers)
+    parsed_feed = render_entries(parsed.entries, parsed.feed)
+    parsed_feed.bozo = bool(parsed.bozo)
+    parsed_feed.version = parsed.get("version", "")
+    parsed_feed.parse_seconds = time.perf_counter() - started - parsed_feed.render_seconds
+    return parsed_feed
+
+
+def parse_entry_ids(body: bytes, headers: dict[str, str]) -> tuple[str, list[str]]:
+    """A feed document's format (as in ParsedFeed.version) and entry IDs, without rendering the entries."""
+    import feedparser
+
+    parsed = feedparser.parse(body, response_headers=headers)
+    return parsed.get("version", ""), [get_entry_id(entry) for entry in parsed.entries]
+
+
+def render_entries(entries, feed, partial: bool = False) -> ParsedFeed:
+    """Render already parsed entries; used directly by the streaming parser."""
+    started = time.perf_counter()
+    cache = get_render_cache()
+    hits, misses = cache.hits, cache.misses
+    records = [
+        EntryRecord(
+            id=get_entry_id(entry),
+            title=clean_title(entry.get("title") or "Untitled"),
+            link=entry.get("link"),
+            content=format_post_content(entry),
+            published=entry.get("published"),
+        )
+        for entry in entries
+    ]
+    hub, topic = feed_links(feed)
+    return ParsedFeed(
+        entries=records,
+        hub=hub,
+        topic=topic,
+        image=feed_image(feed),
+        interval_hint=feed_interval_hint(feed),
+        publish_gap=publish_gap(entries),
+        render_seconds=time.perf_counter() - started,
+        partial=partial,
+        render_cache_hits=cache.hits - hits,
+        render_cache_misses=cache.misses - misses,
+    )
+
+
+def feed_links(feed) -> tuple[str | None, str | None]:
+    """The first rel="hub" and rel="self" link of a feed."""
+    hub = topic = None
+    for link in feed.get("links") or ():
+        rel, href = link.get("rel"), link.get("href")
+        if rel == "hub" and hub is None:
+            hub = href
+        elif rel == "self" and topic is None:
+            topic = href
+    return hub, topic
+
+
+def feed_image(feed) -> str | None:
+    """URL of a feed's <image>, or Atom <logo>/<icon>, if it is an absolute http(s) URL."""
+    image = feed.get("image")
+    for url in (image.get("href") if image else None, feed.get("logo"), feed.get("icon")):
+        if url and url.startswith(("http://", "https://")):
+            return url
+    return None
+
+
+def entry_key(entry_id: str) -> str:
+    """The hash an entry is remembered by in seen_entries."""
+    return hashlib.blake2b(entry_id.encode(), digest_size=16).hexdigest()
+
+
+def get_entry_id(entry) -> str:
+    if hasattr(entry, 'id') and entry.id:
+        return entry.id
+    elif hasattr(entry, 'guid') and entry.guid:
+        return entry.guid
+    elif hasattr(entry, 'link') and entry.link:
+        return entry.link
+    else:
+        return entry.get('title') or "unknown"
+
+
+def clean_title(title: str) -> str:
+    if len(title) > 100:
+        title = title[:97] + "..."
+    return title.strip()
+
+
+def format_post_content(entry) -> str:
+    header = []
+    if hasattr(entry, 'link') and entry.link:
+        header.append(f"🔗 **Link:** {entry.link}")
+        header.append("")
+    
+    footer = []
+    if hasattr(entry, 'published') and entry.published:
+        footer.append("")
+        footer.append(f"📅 **Published:** {entry.published}")
+    
+    html_content = None
+    if hasattr(entry, 'summary') and entry.summary:
+        html_content = entry.summary
+    elif hasattr(entry, 'description') and entry.description:
+        html_content = entry.description
+    elif hasattr(entry, 'content') and entry.content:
+        if isinstance(entry.content, list) and len(entry.content) > 0:
+            html_content = entry.content[0].get('value', '')
+        else:
+            html_content = str(entry.content)
+    
+    content_parts = header
+    if html_content is not None:
+        # Whatever the link and date lines leave of the message limit
+        budget = MAX_MESSAGE_LENGTH - len("\n".join(header + [""] + footer))
+        content_parts = content_parts + [html_to_markdown(html_content, budget)]
+    content_parts = content_parts + footer
+    
+    content = "\n".join(content_parts) if content_parts else "No content available."
+    return truncate(content, MAX_MESSAGE_LENGTH)
+
+
+def html_to_markdown(html_content: str, budget: int = MAX_MESSAGE_LENGTH) -> str:
+    """Convert HTML to Markdown of at most budget characters, reusing earlier renders."""
+    if not html_content or budget <= 0:
+        return ""
+    
+    cache = get_render_cache()
+    key = cache.key(html_content, budget)
+    markdown_content = cache.get(key)
+    if markdown_content is None:
+        markdown_content = truncate(_convert(truncate_html(html_content, budget * HTML_BUDGET_FACTOR)), budget)
+        cache.put(key, markdown_content)
+    return markdown_content
+
+
+def _convert(html_content: str) -> str:
+    from markdownify import markdownify as md
+
+    try:
+        markdown_content = md(
+            html_content,
+            heading_style="ATX",
+            bullets="-",
+            strip=['script', 'style']
+        ).strip()
+        
+        return markdown_content if markdown_content else html_content
+    except Exception as e:
+        logger.warning(f"Failed to convert HTML to markdown: {e}")
+        return html_content
+
+
+def truncate_html(html_content: str, limit: int) -> str:
+    """Cut HTML to about limit characters without leaving half a tag behind."""
+    if len(html_content) <= limit:
+        return html_content
+    cut = html_content[:limit]
+    open_tag = cut.rfind("<")
+    if open_tag > cut.rfind(">"):
+        cut = cut[:open_tag]
+    return cut
+
+
+def format_digest_line(entry: EntryRecord) -> str:
+    """One entry as a line of a digest post."""
+    title = entry.title.replace("[", "\\[").replace("]", "\\]")
+    # Angle brackets keep Discord from embedding a preview for every link
+    return f"- [{title}](<{entry.link}>)" if entry.link else f"- {title}"
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> list[str]:
+    """Split text into messages of at most limit characters, at line breaks where possible."""
+    messages = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                messages.append(current)
+                current = ""
+            messages.append(line[:limit])
+            line = line[limit:]
+        if current and len(current) + 1 + len(line) > limit:
+            messages.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current or not messages:
+        messages.append(current)
+    return messages
+
+
+def truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return text[:limit - 1].rstrip() + "…"
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import random
+from collections.abc import Sequence
+import discord
+from bot import metrics
+from bot.webhooks import WebhookManager
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+BASE_BACKOFF_SECONDS = 2.0
+MAX_BACKOFF_SECONDS = 120.0
+# A lane with nothing to do for this long stops its worker
+LANE_IDLE_SECONDS = 300.0
+
+
+class PostJob:
+    def __init__(
+        self,
+        channel: discord.ForumChannel,
+        title: str,
+        content: str,
+        follow_ups: Sequence[str] = (),
+        username: str | None = None,
+        avatar_url: str | None = None,
+    ):
+        self.channel = channel
+        self.title = title
+        self.content = content
+        # Sent as messages in the new thread, for posts longer than one message
+        self.follow_ups = follow_ups
+        # Name and avatar the post is shown with when it goes through a webhook
+        self.username = username
+        self.avatar_url = avatar_url
+        # The webhook that created the thread, if one did
+        self.webhook: discord.Webhook | None = None
+        self.attempts = 0
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class PostingQueue:
+    """
+    Outbound forum posts, with one worker lane per channel.
+
+    Each lane sends one post at a time, which matches Discord's per-channel
+    bucket for thread creation; discord.py waits out the bucket itself, the
+    lane adds backoff and retries for rate limits and errors that escape it.
+    A global limit caps how many lanes send at the same time.
+
+    With webhooks, threads are created through each channel's webhook, which
+    has rate-limit buckets of its own, and as the bot where there is none.
+    """
+
+    def __init__(self, max_active_lanes: int, webhooks: WebhookManager | None = None):
+        self.webhooks = webhooks
+        self._lanes: dict[int, asyncio.Queue[PostJob]] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+        self._active = asyncio.Semaphore(max_active_lanes)
+
+    @property
+    def depth(self) -> int:
+        """Number of posts waiting across all lanes."""
+        return sum(lane.qsize() for lane in self._lanes.values())
+
+    def submit(
+        self,
+        channel: discord.ForumChannel,
+        title: str,
+        content: str,
+        follow_ups: Sequence[str] = (),
+        *,
+        username: str | None = None,
+        avatar_url: str | None = None,
+    ) -> asyncio.Future:
+        """Queue a post; the returned future resolves to the created thread."""
+        job = PostJob(channel, title, content, follow_ups, username, avatar_url)
+        lane = self._lanes.get(channel.id)
+        if lane is None:
+            lane = asyncio.Queue()
+            self._lanes[channel.id] = lane
+        lane.put_nowait(job)
+
+        worker = self._workers.get(channel.id)
+        if worker is None or worker.done():
+            self._workers[channel.id] = asyncio.create_task(self._run_lane(channel.id, lane))
+        return job.future
+
+    async def close(self):
+        for worker in self._workers.values():
+            worker.cancel()
+        for lane in self._lanes.values():
+            while not lane.empty():
+                job = lane.get_nowait()
+                if not job.future.done():
+                    job.future.cancel()
+        self._workers.clear()
+        self._lanes.clear()
+
+    async def _run_lane(self, channel_id: int, lane: asyncio.Queue):
+        while True:
+            try:
+                job = await asyncio.wait_for(lane.get(), timeout=LANE_IDLE_SECONDS)
+            except asyncio.TimeoutError:
+                if lane.empty():
+                    del self._lanes[channel_id]
+                    del self._workers[channel_id]
+                    return
+                continue
+
+            if job.future.cancelled():
+                continue
+            try:
+                thread = await self._send_with_retries(job)
+            except Exception as e:
+                metrics.POSTS.inc(result="failed")
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                metrics.POSTS.inc(result="created")
+                try:
+                    await self._send_follow_ups(job, thread)
+                except Exception as e:
+                    # The thread exists, so the post still counts as delivered
+                    logger.error(f"Failed to send the rest of post '{job.title}' to thread {thread.id}: {e}")
+                if not job.future.done():
+                    job.future.set_result(thread)
+
+    async def _send_with_retries(self, job: PostJob) -> discord.abc.Snowflake:
+        while True:
+            job.attempts += 1
+            try:
+                async with self._active:
+                    return await self._create_thread(job)
+            except discord.RateLimited as e:
+                # Only raised when discord.py refuses to wait out a long rate limit itself
+                if job.attempts >= MAX_ATTEMPTS:
+                    raise
+                metrics.RATE_LIMITED.inc(operation="create_thread")
+                logger.warning(f"Posting to channel {job.channel.id} rate limited for {e.retry_after:.1f}s")
+                await asyncio.sleep(e.retry_after)
+            except discord.HTTPException as e:
+                if not is_retryable(e) or job.attempts >= MAX_ATTEMPTS:
+                    raise
+                delay = backoff_delay(job.attempts)
+                if e.status == 429:
+                    metrics.RATE_LIMITED.inc(operation="create_thread")
+                    delay = max(delay, getattr(e, "retry_after", 0) or 0)
+                logger.warning(
+                    f"Posting to channel {job.channel.id} failed with {e.status}, "
+                    f"retrying in {delay:.1f}s (attempt {job.attempts}/{MAX_ATTEMPTS})"
+                )
+                await asyncio.sleep(delay)
+
+    async def _create_thread(self, job: PostJob) -> discord.abc.Snowflake:
+        webhook = await self.webhooks.get(job.channel) if self.webhooks is not None else None
+        if webhook is not None:
+            try:
+                message = await webhook.send(
+                    job.content,
+                    username=job.username,
+                    avatar_url=job.avatar_url,
+                    thread_name=job.title,
+                    wait=True,
+                )
+                job.webhook = webhook
+                # The message was posted in the new thread, so its channel is the thread
+                return message.channel
+            except (discord.NotFound, discord.Forbidden) as e:
+                # Webhook deleted or no longer allowed; post as the bot and set up anew next time
+                logger.warning(f"Webhook for channel {job.channel.id} failed, posting as the bot: {e}")
+                await self.webhooks.forget(job.channel.id)
+        thread_with_message = await job.channel.create_thread(name=job.title, content=job.content)
+        return thread_with_message.thread
+
+    async def _send_follow_ups(self, job: PostJob, thread: discord.abc.Snowflake):
+        """
+        Send the rest of a long post into its thread. The thread exists by now, so
+        a message that keeps failing is logged and the rest dropped rather than
+        the whole post being sent again.
+        """
+        for position, content in enumerate(job.follow_ups, start=1):
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                try:
+                    async with self._active:
+                        if job.webhook is not None:
+                            await job.webhook.send(
+                                content, username=job.username, avatar_url=job.avatar_url, thread=thread
+                            )
+                        else:
+                            await thread.send(content)
+                    break
+                except discord.RateLimited as e:
+                    error, delay = e, e.retry_after
+                except discord.HTTPException as e:
+                    error, delay = e, backoff_delay(attempt) if is_retryable(e) else None
+                if delay is None or attempt == MAX_ATTEMPTS:
+                    logger.error(
+                        f"Failed to send part {position + 1} of post '{job.title}' to thread {thread.id}, "
+                        f"dropping the remaining {len(job.follow_ups) - position + 1}: {error}"
+                    )
+                    return
+                await asyncio.sleep(delay)
+
+
+def is_retryable(error: discord.HTTPException) -> bool:
+    return error.status == 429 or error.status >= 500
+
+
+def backoff_delay(attempt: int) -> float:
+    delay = min(BASE_BACKOFF_SECONDS * 2 ** (attempt - 1), MAX_BACKOFF_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
@@ -0,0 +1,167 @@
+"""
+On-demand sampling profiler for the running bot.
+
+While a profile runs, a background thread snapshots the Python stack of
+every thread at a fixed interval through sys._current_frames(), which
+covers the event loop and the executor threads without instrumenting
+them. Poll stages time themselves with stage(); with no profile running
+that is a single global lookup. Parse worker processes (PARSE_WORKERS) are
+separate processes and not sampled, but their work shows in the parse stage.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from types import CodeType
+
+
+DEFAULT_INTERVAL_SECONDS = 0.01
+# Leaf frames of a thread that is waiting rather than running Python code
+IDLE_FILES = {"selectors.py", "threading.py"}
+IDLE_FUNCTIONS = {"thread.py:_worker"}
+
+_active: "Profile | None" = None
+_labels: dict[CodeType, str] = {}
+
+
+class Profile:
+    def __init__(self, interval: float = DEFAULT_INTERVAL_SECONDS):
+        self.interval = interval
+        # (thread name, outermost frame, ..., innermost frame) -> samples
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self.stages: defaultdict[str, list[float]] = defaultdict(list)
+        self.samples = 0
+        self.started = 0.0
+        self.duration = 0.0
+        # Time the sampler thread spent taking samples
+        self.sampling_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def record_stage(self, name: str, seconds: float):
+        self.stages[name].append(seconds)
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            started = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+            self.samples += 1
+            self.sampling_seconds += time.perf_counter() - started
+
+    def collapsed(self) -> str:
+        """Samples in collapsed-stack format, one "thread;frame;...;frame count" line per stack."""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def report(self, top: int = 25) -> str:
+        overhead = self.sampling_seconds / self.duration * 100 if self.duration else 0.0
+        lines = [
+            f"Profile of {self.duration:.1f}s: {self.samples} samples every {self.interval * 1000:.0f} ms, "
+            f"sampler busy {overhead:.1f}% of the time",
+            "",
+            "Threads (samples, share spent waiting):",
+        ]
+        per_thread: Counter[str] = Counter()
+        idle: Counter[str] = Counter()
+        own: Counter[str] = Counter()
+        inclusive: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            thread = stack[0]
+            per_thread[thread] += count
+            if len(stack) == 1 or _is_idle(stack[-1]):
+                idle[thread] += count
+                continue
+            own[stack[-1]] += count
+            for label in set(stack[1:]):
+                inclusive[label] += count
+        for thread, count in per_thread.most_common():
+            lines.append(f"  {thread:<40} {count:>7} {idle[thread] / count * 100:>5.0f}% waiting")
+
+        if self.stages:
+            lines += ["", "Poll stages (wall time per call, including awaits):"]
+            lines.append(f"  {'stage':<16} {'calls':>7} {'total s':>9} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9}")
+            for name, durations in sorted(self.stages.items(), key=lambda item: -sum(item[1])):
+                ordered = sorted(durations)
+                p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+                lines.append(
+                    f"  {name:<16} {len(ordered):>7} {sum(ordered):>9.2f} "
+                    f"{sum(ordered) / len(ordered) * 1000:>9.1f} {p95 * 1000:>9.1f} {ordered[-1] * 1000:>9.1f}"
+                )
+
+        busy = sum(own.values())
+        for title, counter in (("own", own), ("total", inclusive)):
+            lines += ["", f"Top functions by {title} samples ({busy} busy samples):"]
+            for label, count in counter.most_common(top):
+                share = count / busy * 100 if busy else 0.0
+                lines.append(f"  {share:>5.1f}% {count:>7}  {label}")
+        return "\n".join(lines) + "\n"
+
+
+def _label(code: CodeType) -> str:
+    label = _labels.get(code)
+    if label is None:
+        label = f"{os.path.basename(code.co_filename)}:{code.co_qualname}"
+        _labels[code] = label
+    return label
+
+
+def _is_idle(label: str) -> bool:
+    return label.partition(":")[0] in IDLE_FILES or label in IDLE_FUNCTIONS
+
+
+def is_running() -> bool:
+    return _active is not None
+
+
+async def run_profile(seconds: float, interval: float = DEFAULT_INTERVAL_SECONDS) -> Profile:
+    """Sample the whole process for the given time. Raises RuntimeError if a profile is already running."""
+    global _active
+    if _active is not None:
+        raise RuntimeError("a profile is already running")
+    profile = Profile(interval)
+    _active = profile
+    profile.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profile.stop()
+        _active = None
+    return profile
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as a named stage of the running profile, if there is one."""
+    profile = _active
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record_stage(name, time.perf_counter() - started)
@@ -0,0 +1,116 @@
+"""
+Retention of old forum posts.
+
+A feed keeps its posts active for a number of days, or keeps only its most
+recent ones; feeds without a policy of their own use RETENTION_DAYS. Each
+pass archives and locks the threads past their feed's retention, a batch at
+a time with a pause in between, so the bot's rate limits stay free for new
+posts. Their feed_posts rows move to the compact feed_post_archive table,
+where feed removal still finds them; rows of deleted threads are dropped.
+Threads that could not be archived keep their rows and are tried again on
+the next pass.
+"""
+import asyncio
+import logging
+import time
+import discord
+from discord.ext import tasks
+from bot import db, metrics
+from bot.config import get_retention_batch_size, get_retention_days, get_retention_interval_minutes
+from bot.posting import MAX_ATTEMPTS, backoff_delay, is_retryable
+
+
+logger = logging.getLogger(__name__)
+
+# Pause between two batches of the same pass
+BATCH_PAUSE_SECONDS = 5.0
+ARCHIVED = "archived"
+GONE = "gone"
+FORBIDDEN = "forbidden"
+FAILED = "failed"
+
+
+class RetentionManager:
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+        self.default_days = get_retention_days()
+        self.batch_size = get_retention_batch_size()
+
+    def start(self):
+        self.enforce.change_interval(minutes=get_retention_interval_minutes())
+        self.enforce.start()
+
+    async def close(self):
+        if self.enforce.is_running():
+            self.enforce.cancel()
+
+    @tasks.loop(minutes=60)
+    async def enforce(self):
+        await self.enforce_once()
+
+    async def enforce_once(self) -> tuple[int, int]:
+        """Archive every post past its feed's retention. Returns (archived, forgotten)."""
+        archived = forgotten = 0
+        try:
+            now = time.time()
+            for policy in await db.get_retention_policies(self.default_days):
+                days = policy["retention_days"]
+                created_before = now - days * 86400 if days and days > 0 else None
+                # Walks past rows that stay behind, so they cannot hold up the rest of the feed
+                after_id = 0
+                while True:
+                    rows = await db.get_expired_feed_posts(
+                        policy["id"], created_before, policy["retention_posts"], self.batch_size, after_id
+                    )
+                    if not rows:
+                        break
+                    after_id = rows[-1]["id"]
+                    results = [await self._archive_thread(row["thread_id"]) for row in rows]
+                    done = [row["id"] for row, result in zip(rows, results) if result == ARCHIVED]
+                    gone = [row["id"] for row, result in zip(rows, results) if result == GONE]
+                    await db.archive_feed_posts(done, gone, time.time())
+                    archived += len(done)
+                    forgotten += len(gone)
+                    if len(rows) < self.batch_size:
+                        break
+                    await asyncio.sleep(BATCH_PAUSE_SECONDS)
+        except Exception as e:
+            logger.error(f"Error enforcing post retention: {e}")
+        if archived or forgotten:
+            logger.info(f"Retention archived {archived} forum posts and forgot {forgotten} deleted ones")
+        return archived, forgotten
+
+    async def _archive_thread(self, thread_id: int) -> str:
+        """Archive and lock one thread, retrying rate limits and server errors."""
+        result = FAILED
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                # Threads Discord archived on its own are not cached, but may still need locking
+                thread = self.bot.get_channel(thread_id) or await self.bot.fetch_channel(thread_id)
+                if not isinstance(thread, discord.Thread):
+                    logger.warning(f"Channel {thread_id} is not a thread")
+                    break
+                if not (thread.archived and thread.locked):
+                    await thread.edit(archived=True, locked=True, reason="Feed post retention")
+                    logger.debug(f"Archived thread {thread_id}")
+                result = ARCHIVED
+                break
+            except discord.NotFound:
+                result = GONE
+                break
+            except discord.Forbidden:
+                logger.warning(f"No permission to archive thread {thread_id}, keeping it for the next pass")
+                result = FORBIDDEN
+                break
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    metrics.RATE_LIMITED.inc(operation="archive_thread")
+                if not is_retryable(e) or attempt == MAX_ATTEMPTS:
+                    logger.error(f"Error archiving thread {thread_id}: {e}")
+                    break
+                await asyncio.sleep(max(backoff_delay(attempt), getattr(e, "retry_after", 0) or 0))
+            except Exception as e:
+                logger.error(f"Error archiving thread {thread_id}: {e}")
+                break
+        metrics.RETAINED_POSTS.inc(result=result)
+        return result
@@ -1,94 +1,423 @@
 import asyncio
 import logging
+import time
+from dataclasses import replace
+from concurrent.futures import Executor, ProcessPoolExecutor
 from typing import Optional
+from urllib.parse import urlparse
+from xml.etree.ElementTree import ParseError
+import aiohttp
 import discord
-import feedparser
-from markdownify import markdownify as md
 from discord.ext import tasks
-from bot.config import get_poll_interval
-from bot import db
+from bot.config import (
+    get_digest_window_minutes,
+    get_failure_threshold,
+    get_fetch_cache_seconds,
+    get_max_concurrent_fetches,
+    get_max_fetches_per_host,
+    get_parse_workers,
+    get_max_poll_interval,
+    get_min_poll_interval,
+    get_poll_interval,
+    get_scheduler_tick,
+    get_seen_entry_retention_days,
+    get_startup_stagger,
+    get_streaming_parse,
+    get_websub_callback_url,
+    get_websub_server,
+)
+from bot import db, metrics
+from bot.outbox import OutboxDrainer
+from bot.profiler import stage
+from bot.fetcher import FeedFetcher, FetchResult, TTLCache, normalize_url
+from bot.parsing import (
+    EntryRecord,
+    ParsedFeed,
+    entry_key,
+    format_digest_line,
+    parse_feed,
+    render_entries,
+    truncate,
+)
+from bot.streaming import StreamingFeedParser
+from bot.websub import WebSubSubscriber
+from bot.scheduler import (
+    FeedScheduler,
+    PollOutcome,
+    cache_control_hint,
+    retry_after_hint,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# Seen entries still in their feed are re-marked at most this often
+SEEN_REFRESH_SECONDS = 24 * 3600
+PRUNE_INTERVAL_SECONDS = 3600
+
 
 class RSSPoller:
-    def __init__(self, bot: discord.Client):
+    def __init__(self, bot: discord.Client | None, outbox: OutboxDrainer | None = None):
         self.bot = bot
+        # Woken when new posts are queued, so they go out without waiting for its next pass
+        self.outbox = outbox
         self.poll_interval = get_poll_interval()
+        self.max_fetches_per_host = get_max_fetches_per_host()
+        self._fetch_slots = asyncio.Semaphore(get_max_concurrent_fetches())
+        self._host_slots: dict[str, asyncio.Semaphore] = {}
+        self._cycles: set[asyncio.Task] = set()
+        self.seen_entry_retention = get_seen_entry_retention_days() * 86400
+        self.failure_threshold = get_failure_threshold()
+        self.digest_window = get_digest_window_minutes() * 60
+        self._last_prune = 0.0
+        self.fetcher = FeedFetcher()
+        # Parsed results of recent fetches, keyed by normalized URL
+        self._recent_fetches = TTLCache(get_fetch_cache_seconds())
+        self.streaming_parse = get_streaming_parse()
+        # URLs whose documents the streaming parser could not handle
+        self._stream_unsupported: set[str] = set()
+        # Parsing and markdown rendering are CPU-bound; a process pool keeps them off
+        # the gateway's event loop thread. Without one, the default thread pool is used.
+        parse_workers = get_parse_workers()
+        self._parse_executor: Executor | None = (
+            ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+        )
+        # Hub-enabled feeds are pushed to a callback server when one is configured
+        callback_url = get_websub_callback_url()
+        self.websub = None
+        if callback_url:
+            # Workers run without a bot; one of them may be picked to serve callbacks
+            self.websub = WebSubSubscriber(self, callback_url, get_websub_server(default=bot is not None))
+        # Feeds overdue at startup are spread over this many seconds on the first tick
+        self._startup_spread = float(get_startup_stagger())
+        self.scheduler = FeedScheduler(
+            base_interval=self.poll_interval * 60,
+            min_interval=get_min_poll_interval() * 60,
+            max_interval=get_max_poll_interval() * 60,
+        )
+        
+        metrics.POLL_INTERVAL_SECONDS.set(self.poll_interval * 60)
+        metrics.SCHEDULED_FEEDS.set_function(lambda: len(self.scheduler))
     
     def start_polling(self):
+        self.poll_feeds.change_interval(seconds=get_scheduler_tick())
         self.poll_feeds.start()
+        if self.websub is not None:
+            self.websub.start()
+        logger.info(f"RSS polling started with {self.poll_interval} minute base interval")
     
     def stop_polling(self):
         if self.poll_feeds.is_running():
             self.poll_feeds.cancel()
+        for cycle in self._cycles:
+            cycle.cancel()
+    
+    async def close(self):
+        self.stop_polling()
+        if self.websub is not None:
+            await self.websub.close()
+        await self.fetcher.close()
+        if self._parse_executor is not None:
+            self._parse_executor.shutdown(wait=False, cancel_futures=True)
     
     @tasks.loop(minutes=1)
     async def poll_feeds(self):
-        if not hasattr(self, '_actual_interval_set'):
-            self.poll_feeds.change_interval(minutes=self.poll_interval)
-            self._actual_interval_set = True
-            logger.info(f"RSS polling started with {self.poll_interval} minute interval")
-            return
-        
+        """Start a poll cycle for every feed whose next poll time has passed."""
         try:
-            feeds = await db.get_all_feeds()
-            for feed_row in feeds:
-                await self._process_feed(feed_row)
+            await self._prune_seen_entries()
+            
+            batch = await self._due_feeds()
+            if not batch:
+                return
+            
+            # Cycles run in the background so a slow batch never delays the next tick
+            cycle = asyncio.create_task(self._run_cycle(batch))
+            self._cycles.add(cycle)
+            cycle.add_done_callback(self._cycles.discard)
         except Exception as e:
             logger.error(f"Error during RSS polling: {e}")
     
-    async def _process_feed(self, feed_row):
-        feed_id = feed_row[0]
-        forum_channel_id = feed_row[1]
-        url = feed_row[2]
-        name = feed_row[3]
-        last_entry_id = feed_row[4]
+    async def _due_feeds(self) -> list:
+        feeds = await db.get_all_feeds()
+        self.scheduler.sync(feeds, spread=self._startup_spread)
+        self._startup_spread = 0.0
+        due = set(self.scheduler.pop_due())
+        if not due:
+            return []
+        
+        # Every subscriber of a due URL is polled with it, since the fetch is shared
+        due_urls = {normalize_url(feed_row["url"]) for feed_row in feeds if feed_row["id"] in due}
+        due.update(self.scheduler.claim(
+            feed_row["id"] for feed_row in feeds
+            if feed_row["id"] not in due and normalize_url(feed_row["url"]) in due_urls
+        ))
+        return [feed_row for feed_row in feeds if feed_row["id"] in due]
+    
+    async def _run_cycle(self, feeds):
+        """
+        Fetch each distinct URL once, concurrently, and fan the result out to every
+        subscribing feed through a single processing stage.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        outcomes: dict[int, PollOutcome] = {}
         
+        subscriptions: dict[str, list] = {}
+        for feed_row in feeds:
+            subscriptions.setdefault(normalize_url(feed_row["url"]), []).append(feed_row)
+        
+        process_queue: asyncio.Queue = asyncio.Queue()
+        processor = asyncio.create_task(self._processing_stage(process_queue))
         try:
-            forum_channel = self.bot.get_channel(forum_channel_id)
-            if not forum_channel:
-                logger.error(f"Forum channel {forum_channel_id} not found for feed {feed_id}")
-                return
-            
-            if not isinstance(forum_channel, discord.ForumChannel):
-                logger.error(f"Channel {forum_channel_id} is not a forum channel for feed {feed_id}")
-                return
+            await asyncio.gather(
+                *(
+                    self._fetch_stage(url, subscribers, process_queue, outcomes)
+                    for url, subscribers in subscriptions.items()
+                )
+            )
+        finally:
+            await process_queue.put(None)
+            await processor
+            await self._reschedule(feeds, outcomes)
+            await db.flush_writes()
+        
+        metrics.CYCLE_SECONDS.observe(loop.time() - started)
+        not_modified = sum(1 for outcome in outcomes.values() if outcome.not_modified)
+        modified = sum(
+            1 for outcome in outcomes.values() if not outcome.not_modified and not outcome.failed
+        )
+        logger.info(
+            f"Poll cycle for {len(feeds)} feeds ({len(subscriptions)} URLs) "
+            f"finished in {loop.time() - started:.1f}s "
+            f"(conditional GET: {not_modified} not modified, {modified} modified; "
+            f"{sum(outcome.new_entries for outcome in outcomes.values())} posts queued)"
+        )
+    
+    async def _reschedule(self, feeds, outcomes: dict[int, PollOutcome]):
+        schedules = []
+        failures = []
+        for feed_row in feeds:
+            outcome = outcomes.get(feed_row["id"])
+            interval, next_poll_at = self.scheduler.reschedule(feed_row["id"], outcome)
+            schedules.append((feed_row["id"], interval, next_poll_at))
             
-            parsed_feed = await self._fetch_rss_feed(url)
-            if not parsed_feed:
-                return
+            if outcome is not None and outcome.failed:
+                # A failing feed is not fetched again before next_poll_at, which backs off exponentially
+                failures.append((feed_row["id"], outcome.failures, outcome.error, next_poll_at))
+                if outcome.failures == self.failure_threshold:
+                    logger.warning(
+                        f"Feed {feed_row['id']} ({feed_row['url']}) failed {outcome.failures} times "
+                        f"in a row, backing off: {outcome.error}"
+                    )
+            elif outcome is not None and feed_row["consecutive_failures"]:
+                failures.append((feed_row["id"], 0, None, None))
+                logger.info(f"Feed {feed_row['id']} ({feed_row['url']}) recovered")
+        try:
+            await db.update_feed_schedules(schedules)
+            if failures:
+                await db.update_feed_failures(failures)
+        except Exception as e:
+            logger.error(f"Failed to store feed schedules: {e}")
+    
+    async def _fetch_stage(
+        self, url: str, subscribers, process_queue: asyncio.Queue, outcomes: dict[int, PollOutcome]
+    ):
+        """Fetch and parse one URL, then queue the result for each subscribing feed."""
+        targets = []
+        for feed_row in subscribers:
+            forum_channel = self._get_forum_channel(feed_row)
+            if forum_channel:
+                targets.append((forum_channel, feed_row))
+        if not targets:
+            return
+        
+        try:
+            cached = self._recent_fetches.get(url)
+            if cached is not None:
+                response, parsed_feed = cached
+            else:
+                # Validators are only safe to send if every subscriber has processed the same version
+                validators = {(feed_row["etag"], feed_row["last_modified"]) for _, feed_row in targets}
+                etag, last_modified = validators.pop() if len(validators) == 1 else (None, None)
+                
+                stream = self._streaming_parser(url, targets)
+                async with self._host_slot(url), self._fetch_slots:
+                    with stage("fetch"):
+                        response = await self._fetch_rss_feed(url, etag, last_modified, stream)
+                if isinstance(response, PollOutcome):
+                    # Fetch failed, only keep any Retry-After the server sent
+                    self._record_failure(targets, outcomes, response)
+                    return
+                
+                self._record_success(targets)
+                if response.not_modified:
+                    for _, feed_row in targets:
+                        outcomes[feed_row["id"]] = PollOutcome(
+                            not_modified=True,
+                            min_interval=cache_control_hint(response.headers),
+                            safety_interval=self._safety_interval(url),
+                        )
+                    logger.debug(f"{url} not modified since last poll")
+                    return
+                
+                if stream is not None and url not in self._stream_unsupported:
+                    parsed_feed = await self._render_streamed_feed(url, stream)
+                else:
+                    parsed_feed = await self._parse_rss_feed(url, response)
+                if not parsed_feed:
+                    self._record_failure(targets, outcomes, PollOutcome(failed=True, error="feed could not be parsed"))
+                    return
+                if parsed_feed.bozo and not parsed_feed.entries:
+                    # Typically an error or parking page served with a 200
+                    self._record_failure(targets, outcomes, PollOutcome(failed=True, error="response is not a feed"))
+                    return
+                # A partial result only covers entries above these subscribers' markers.
+                # Hits only read the headers, so the raw document is not kept.
+                if not parsed_feed.partial:
+                    self._recent_fetches.put(url, (replace(response, body=b""), parsed_feed))
+                if self.websub is not None:
+                    await self.websub.discovered(url, parsed_feed, response.headers)
             
+            hints = [hint for hint in (cache_control_hint(response.headers), parsed_feed.interval_hint) if hint]
+            for forum_channel, feed_row in targets:
+                outcome = PollOutcome(
+                    min_interval=max(hints) if hints else None,
+                    publish_gap=parsed_feed.publish_gap,
+                    safety_interval=self._safety_interval(url),
+                )
+                outcomes[feed_row["id"]] = outcome
+                await process_queue.put((forum_channel, feed_row, parsed_feed, response, outcome))
+        except Exception as e:
+            logger.error(f"Error fetching feed {url}: {e}")
+    
+    def _safety_interval(self, url: str) -> float | None:
+        if self.websub is not None and self.websub.is_pushed(url):
+            return self.websub.safety_interval
+        return None
+    
+    def _record_failure(self, targets, outcomes: dict[int, PollOutcome], outcome: PollOutcome):
+        for _, feed_row in targets:
+            outcomes[feed_row["id"]] = replace(outcome, failures=feed_row["consecutive_failures"] + 1)
+    
+    def _streaming_parser(self, url: str, targets) -> StreamingFeedParser | None:
+        """A parser that stops at the subscribers' last posted entries, if streaming applies."""
+        if not self.streaming_parse or url in self._stream_unsupported:
+            return None
+        stop_ids = {feed_row["last_entry_id"] for _, feed_row in targets}
+        # Without a marker for every subscriber the whole document is needed anyway
+        if None in stop_ids:
+            return None
+        return StreamingFeedParser(url, stop_ids)
+    
+    def _record_success(self, targets):
+        now = time.time()
+        for _, feed_row in targets:
+            metrics.FEED_LAST_SUCCESS.set(now, feed_id=str(feed_row["id"]))
+    
+    def _get_forum_channel(self, feed_row) -> discord.ForumChannel | None:
+        feed_id = feed_row["id"]
+        forum_channel_id = feed_row["forum_channel_id"]
+        
+        forum_channel = self.bot.get_channel(forum_channel_id)
+        if not forum_channel:
+            logger.error(f"Forum channel {forum_channel_id} not found for feed {feed_id}")
+            return None
+        
+        if not isinstance(forum_channel, discord.ForumChannel):
+            logger.error(f"Channel {forum_channel_id} is not a forum channel for feed {feed_id}")
+            return None
+        
+        return forum_channel
+    
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).hostname or url
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = asyncio.Semaphore(self.max_fetches_per_host)
+            self._host_slots[host] = slot
+        return slot
+    
+    async def _processing_stage(self, process_queue: asyncio.Queue):
+        # Feeds are processed side by side; each only waits on the database
+        processing = []
+        while True:
+            item = await process_queue.get()
+            if item is None:
+                break
+            forum_channel, feed_row, parsed_feed, response, outcome = item
+            processing.append(asyncio.create_task(
+                self._process_feed(forum_channel, feed_row, parsed_feed, response, outcome)
+            ))
+        await asyncio.gather(*processing)
+    
+    async def _process_feed(
+        self,
+        forum_channel: discord.ForumChannel,
+        feed_row,
+        parsed_feed: ParsedFeed,
+        response: FetchResult | None,
+        outcome: PollOutcome,
+    ):
+        feed_id = feed_row["id"]
+        url = feed_row["url"]
+        name = feed_row["name"]
+        last_entry_id = feed_row["last_entry_id"]
+        
+        try:
             entries = parsed_feed.entries
             if not entries:
                 logger.debug(f"No entries found in feed {feed_id} ({url})")
                 return
             
-            new_entries = []
+            with stage("dedup"):
+                new_entries, stale_hashes = await self._find_new_entries(feed_id, last_entry_id, entries)
+            new_entries.reverse()
+            outcome.new_entries = len(new_entries)
             
-            if last_entry_id is None:
-                new_entries = entries[:15]
-                logger.info(f"First run for feed {feed_id}, posting {len(new_entries)} recent entries")
-            else:
-                for entry in entries:
-                    entry_id = self._get_entry_id(entry)
-                    if entry_id == last_entry_id:
-                        break
-                    new_entries.append(entry)
+            # Only remember validators together with the entries behind them,
+            # otherwise a 304 on the next poll could hide unqueued items.
+            # Pushed documents carry none; the next poll's are still valid.
+            validators = None
+            if response is not None:
+                validators = (response.etag, response.last_modified)
+                if validators == (feed_row["etag"], feed_row["last_modified"]):
+                    validators = None
+            # Streamed feeds have no image; only a new one replaces the stored one
+            avatar_url = parsed_feed.image if parsed_feed.image != feed_row["avatar_url"] else None
+            if not new_entries and not stale_hashes and validators is None and avatar_url is None:
+                logger.debug(f"No new entries for feed {feed_id}")
+                return
             
-            if new_entries:
-                new_entries.reverse()
-                
-                for entry in new_entries:
-                    await self._create_forum_post(forum_channel, entry, feed_id)
-                    await asyncio.sleep(1)
-                
-                latest_entry_id = self._get_entry_id(new_entries[-1])
-                await db.update_last_entry_id(feed_id, latest_entry_id)
-                
+            now = time.time()
+            digest = None
+            if new_entries and feed_row["post_mode"] == "digest":
+                digest = self._digest(feed_row, new_entries, now)
+            
+            # Posts are queued in the outbox in the same transaction as the dedup
+            # state, and delivered from there without holding up the poll
+            with stage("store"):
+                await db.store_poll_results(
+                    feed_id,
+                    forum_channel.id,
+                    [(entry.id, entry.title, entry.content) for entry in new_entries],
+                    stale_hashes,
+                    now,
+                    # Entries below the point where streaming stopped were not looked up,
+                    # keep their rows alive along with the refresh of the ones that were
+                    touch_seen=parsed_feed.partial and bool(stale_hashes),
+                    validators=validators,
+                    digest=digest,
+                    avatar_url=avatar_url,
+                )
+            
+            if digest is not None:
                 feed_display_name = name if name else url
-                logger.info(f"Posted {len(new_entries)} new entries for feed '{feed_display_name}'")
+                logger.info(f"Added {len(new_entries)} new entries to the digest for feed '{feed_display_name}'")
+            elif new_entries:
+                feed_display_name = name if name else url
+                logger.info(f"Queued {len(new_entries)} new entries for feed '{feed_display_name}'")
+                if self.outbox is not None:
+                    self.outbox.wake()
             else:
                 logger.debug(f"No new entries for feed {feed_id}")
                 
@@ -96,93 +425,165 @@ class RSSPoller:
             feed_display_name = name if name else url
             logger.error(f"Error processing feed '{feed_display_name}': {e}")
     
-    async def _fetch_rss_feed(self, url: str):
+    def _digest(self, feed_row, entries: list[EntryRecord], now: float) -> tuple[str, str, str, float]:
+        """
+        The digest post that entries found at `now` belong to: one per feed and
+        window, sent when the window ends. Returns (entry_id, title, content, deliver_at).
+        """
+        window_start = now - now % self.digest_window
+        suffix = time.strftime(" · %Y-%m-%d %H:%M UTC", time.gmtime(window_start))
+        # Thread names are limited to 100 characters; the window is what tells digests apart
+        title = truncate(feed_row["name"] or feed_row["url"], 100 - len(suffix)) + suffix
+        content = "\n".join(format_digest_line(entry) for entry in entries)
+        return f"digest:{int(window_start)}", title, content, window_start + self.digest_window
+    
+    async def ingest_pushed(self, url: str, body: bytes, headers: dict[str, str]) -> int:
+        """
+        Run a document a WebSub hub pushed for a normalized feed URL through the
+        same dedup and outbox path as a polled one. Returns the number of posts queued.
+        """
+        feeds = [feed_row for feed_row in await db.get_all_feeds() if normalize_url(feed_row["url"]) == url]
+        if not feeds:
+            return 0
+        parsed_feed = await self._parse_rss_feed(url, FetchResult(200, body, headers))
+        if not parsed_feed or not parsed_feed.entries:
+            return 0
+        
+        queued = 0
+        for feed_row in feeds:
+            forum_channel = self._get_forum_channel(feed_row)
+            if forum_channel:
+                outcome = PollOutcome()
+                await self._process_feed(forum_channel, feed_row, parsed_feed, None, outcome)
+                queued += outcome.new_entries
+        logger.info(f"WebSub notification for {url} queued {queued} posts")
+        return queued
+    
+    async def _find_new_entries(self, feed_id: int, last_entry_id: str | None, entries: list[EntryRecord]):
+        """
+        Split a feed's entries into unseen ones and decide which seen-entry rows to write.
+        Returns (new_entries, hashes_to_mark) with new_entries newest first.
+        """
+        now = time.time()
+        hashed = []
+        in_document = set()
+        for entry in entries:
+            entry_hash = entry_key(entry.id)
+            # Feeds occasionally repeat an item within one document
+            if entry_hash not in in_document:
+                in_document.add(entry_hash)
+                hashed.append((entry_hash, entry))
+        
+        seen = await db.get_seen_entries(feed_id, [entry_hash for entry_hash, _ in hashed])
+        if not seen and not await db.has_seen_entries(feed_id):
+            if last_entry_id is None:
+                new_entries = [entry for _, entry in hashed[:15]]
+                logger.info(f"First run for feed {feed_id}, posting {len(new_entries)} recent entries")
+            else:
+                # Feed predates the seen-entry index, fall back to the last posted ID once
+                new_entries = []
+                for _, entry in hashed:
+                    if entry.id == last_entry_id:
+                        break
+                    new_entries.append(entry)
+            return new_entries, list(in_document)
+        
+        new_entries = [entry for entry_hash, entry in hashed if entry_hash not in seen]
+        # Refresh still-present entries now and then so pruning only drops ones gone from the feed
+        to_mark = [
+            entry_hash for entry_hash, _ in hashed
+            if entry_hash not in seen or now - seen[entry_hash] > SEEN_REFRESH_SECONDS
+        ]
+        return new_entries, to_mark
+    
+    async def _prune_seen_entries(self):
+        now = time.time()
+        if now - self._last_prune < PRUNE_INTERVAL_SECONDS:
+            return
+        self._last_prune = now
+        pruned = await db.prune_seen_entries(now - self.seen_entry_retention)
+        if pruned:
+            logger.info(f"Pruned {pruned} seen entries older than the retention period")
+        pruned = await db.prune_outbox(now - self.seen_entry_retention)
+        if pruned:
+            logger.info(f"Pruned {pruned} delivered posts older than the retention period")
+    
+    async def _fetch_rss_feed(
+        self,
+        url: str,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        stream: StreamingFeedParser | None = None,
+    ) -> FetchResult | PollOutcome:
+        """
+        Fetch a feed, returning a PollOutcome instead of a response when it fails.
+        With a stream, the body goes to the streaming parser instead of the response.
+        """
+        host = urlparse(url).hostname or ""
         try:
-            loop = asyncio.get_event_loop()
-            parsed_feed = await loop.run_in_executor(None, feedparser.parse, url)
-            
-            if parsed_feed.bozo:
-                logger.warning(f"RSS feed may be malformed: {url}")
-            
-            return parsed_feed
+            with metrics.FETCH_SECONDS.time(host=host):
+                response = await self.fetcher.fetch(
+                    url, etag, last_modified, on_chunk=stream.feed_data if stream else None
+                )
+            if stream is not None and not response.not_modified and not response.stopped_early:
+                stream.close()
+        except ParseError as e:
+            # Not something the streaming parser handles, let feedparser have the whole document
+            logger.info(f"Streaming parse not supported for {url}, falling back: {e}")
+            self._stream_unsupported.add(url)
+            return await self._fetch_rss_feed(url, etag, last_modified)
+        except aiohttp.ClientResponseError as e:
+            metrics.FETCH_RESULTS.inc(result="error")
+            logger.error(f"Failed to fetch RSS feed {url}: {e}")
+            return PollOutcome(failed=True, retry_after=retry_after_hint(e.headers), error=f"HTTP {e.status} {e.message}")
         except Exception as e:
+            metrics.FETCH_RESULTS.inc(result="error")
             logger.error(f"Failed to fetch RSS feed {url}: {e}")
-            return None
+            # Timeouts carry no message of their own
+            return PollOutcome(failed=True, error=str(e) or type(e).__name__)
+        metrics.FETCH_RESULTS.inc(result="not_modified" if response.not_modified else "modified")
+        return response
     
-    def _get_entry_id(self, entry) -> str:
-        if hasattr(entry, 'id') and entry.id:
-            return entry.id
-        elif hasattr(entry, 'guid') and entry.guid:
-            return entry.guid
-        elif hasattr(entry, 'link') and entry.link:
-            return entry.link
-        else:
-            return entry.title or "unknown"
-    
-    async def _create_forum_post(self, forum_channel: discord.ForumChannel, entry, feed_id: int):
+    async def _parse_rss_feed(self, url: str, response: FetchResult) -> ParsedFeed | None:
         try:
-            title = self._clean_title(entry.title if hasattr(entry, 'title') else "Untitled")
-            content = self._format_post_content(entry)
+            loop = asyncio.get_running_loop()
+            with stage("parse"):
+                parsed_feed = await loop.run_in_executor(
+                    self._parse_executor, parse_feed, response.body, response.headers
+                )
             
-            thread_with_message = await forum_channel.create_thread(
-                name=title,
-                content=content
-            )
-            
-            # Record the forum post for cleanup tracking
-            # create_thread returns ThreadWithMessage, we need the thread attribute
-            await db.record_feed_post(feed_id, thread_with_message.thread.id)
+            metrics.PARSE_SECONDS.observe(parsed_feed.parse_seconds)
+            self._observe_render(parsed_feed)
             
-            logger.debug(f"Created forum post: {title}")
+            if parsed_feed.bozo:
+                logger.warning(f"RSS feed may be malformed: {url}")
             
+            return parsed_feed
         except Exception as e:
-            logger.error(f"Failed to create forum post for entry '{entry.title}': {e}")
-    
-    def _clean_title(self, title: str) -> str:
-        if len(title) > 100:
-            title = title[:97] + "..."
-        return title.strip()
-    
-    def _format_post_content(self, entry) -> str:
-        content_parts = []
-        
-        if hasattr(entry, 'link') and entry.link:
-            content_parts.append(f"🔗 **Link:** {entry.link}")
-            content_parts.append("")
-        
-        if hasattr(entry, 'summary') and entry.summary:
-            content_parts.append(self._html_to_markdown(entry.summary))
-        elif hasattr(entry, 'description') and entry.description:
-            content_parts.append(self._html_to_markdown(entry.description))
-        elif hasattr(entry, 'content') and entry.content:
-            if isinstance(entry.content, list) and len(entry.content) > 0:
-                content_parts.append(self._html_to_markdown(entry.content[0].get('value', '')))
-            else:
-                content_parts.append(self._html_to_markdown(str(entry.content)))
-        
-        if hasattr(entry, 'published') and entry.published:
-            content_parts.append("")
-            content_parts.append(f"📅 **Published:** {entry.published}")
-        
-        return "\n".join(content_parts) if content_parts else "No content available."
+            logger.error(f"Failed to parse RSS feed {url}: {e}")
+            return None
     
-    def _html_to_markdown(self, html_content: str) -> str:
-        if not html_content:
-            return ""
-        
+    async def _render_streamed_feed(self, url: str, stream: StreamingFeedParser) -> ParsedFeed | None:
         try:
-            markdown_content = md(
-                html_content,
-                heading_style="ATX",
-                bullets="-",
-                strip=['script', 'style']
-            ).strip()
-            
-            return markdown_content if markdown_content else html_content
+            loop = asyncio.get_running_loop()
+            with stage("render"):
+                parsed_feed = await loop.run_in_executor(
+                    self._parse_executor, render_entries, stream.entries, stream.feed, stream.done
+                )
+            self._observe_render(parsed_feed)
+            return parsed_feed
         except Exception as e:
-            logger.warning(f"Failed to convert HTML to markdown: {e}")
-            return html_content
+            logger.error(f"Failed to render RSS feed {url}: {e}")
+            return None
+    
+    def _observe_render(self, parsed_feed: ParsedFeed):
+        metrics.RENDER_SECONDS.observe(parsed_feed.render_seconds)
+        # Counted in whichever process rendered, so the numbers travel back with the result
+        metrics.RENDER_CACHE.inc(parsed_feed.render_cache_hits, result="hit")
+        metrics.RENDER_CACHE.inc(parsed_feed.render_cache_misses, result="miss")
     
     @poll_feeds.before_loop
     async def before_poll_feeds(self):
-        await self.bot.wait_until_ready()
\ No newline at end of file
+        # Worker processes have no Discord connection to wait for
+        if self.bot is not None:
+            await self.bot.wait_until_ready()
\ No newline at end of file
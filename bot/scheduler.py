@@ -0,0 +1,247 @@
+import calendar
+import email.utils
+import heapq
+import random
+import time
+from dataclasses import dataclass
+
+
+# Seconds per sy:updatePeriod value (RSS syndication module)
+UPDATE_PERIODS = {
+    "hourly": 3600,
+    "daily": 86400,
+    "weekly": 7 * 86400,
+    "monthly": 30 * 86400,
+    "yearly": 365 * 86400,
+}
+
+GROWTH_FACTOR = 1.5
+SHRINK_FACTOR = 0.5
+JITTER = 0.1
+
+
+@dataclass
+class PollOutcome:
+    """What a single poll of a feed told us about how often to poll it."""
+    failed: bool = False
+    not_modified: bool = False
+    new_entries: int = 0
+    publish_gap: float | None = None
+    min_interval: float | None = None
+    retry_after: float | None = None
+    # Consecutive failed polls including this one, and what went wrong
+    failures: int = 0
+    error: str | None = None
+    # Set while a WebSub hub pushes the feed; polls only serve as a safety net then
+    safety_interval: float | None = None
+
+
+class FeedScheduler:
+    """
+    Tracks when each feed is next due, backed by a heap ordered by next_poll_at.
+    Intervals adapt to how often a feed actually changes, within min/max bounds.
+    """
+
+    def __init__(self, base_interval: float, min_interval: float, max_interval: float):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._heap: list[tuple[float, int]] = []
+        self._next_poll_at: dict[int, float] = {}
+        self._intervals: dict[int, float] = {}
+        self._in_flight: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._next_poll_at) + len(self._in_flight)
+
+    def sync(self, feed_rows, now: float | None = None, spread: float = 0.0) -> None:
+        """
+        Add feeds that are new to the scheduler and forget removed ones.
+        With spread, new feeds that are already due are spaced evenly over that
+        many seconds, most overdue first, instead of all becoming due at once.
+        """
+        now = time.time() if now is None else now
+        current_ids = set()
+        overdue = []
+        for row in feed_rows:
+            feed_id = row["id"]
+            current_ids.add(feed_id)
+            if feed_id in self._next_poll_at or feed_id in self._in_flight:
+                continue
+            self._intervals[feed_id] = self._clamp(row["poll_interval"] or self.base_interval)
+            poll_at = row["next_poll_at"] or now
+            if spread and poll_at <= now:
+                overdue.append((poll_at, feed_id))
+            else:
+                self._push(feed_id, poll_at)
+
+        overdue.sort()
+        for position, (_, feed_id) in enumerate(overdue):
+            self._push(feed_id, now + spread * position / len(overdue))
+
+        for feed_id in list(self._next_poll_at):
+            if feed_id not in current_ids:
+                del self._next_poll_at[feed_id]
+                del self._intervals[feed_id]
+
+    def replace(self, feed_rows, now: float | None = None) -> None:
+        """
+        Take feed_rows as the whole schedule, dropping every waiting feed first.
+        Used when the database, not this process, decides which feeds it polls.
+        """
+        self._next_poll_at.clear()
+        self._heap.clear()
+        for feed_id in list(self._intervals):
+            if feed_id not in self._in_flight:
+                del self._intervals[feed_id]
+        self.sync(feed_rows, now)
+
+    def pop_due(self, now: float | None = None) -> list[int]:
+        """Remove and return every feed whose next poll time has passed."""
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            poll_at, feed_id = heapq.heappop(self._heap)
+            # Skip stale heap entries left behind by rescheduling or removal
+            if self._next_poll_at.get(feed_id) != poll_at:
+                continue
+            del self._next_poll_at[feed_id]
+            self._in_flight.add(feed_id)
+            due.append(feed_id)
+        return due
+
+    def claim(self, feed_ids) -> list[int]:
+        """
+        Take feeds off the schedule early so they can be polled along with due ones.
+        Returns the IDs that were claimed; feeds already being polled are skipped.
+        """
+        claimed = []
+        for feed_id in feed_ids:
+            if feed_id in self._next_poll_at:
+                # The heap entry goes stale and is skipped by pop_due
+                del self._next_poll_at[feed_id]
+                self._in_flight.add(feed_id)
+                claimed.append(feed_id)
+        return claimed
+
+    def reschedule(self, feed_id: int, outcome: PollOutcome | None, now: float | None = None) -> tuple[float, float]:
+        """
+        Put a polled feed back on the schedule.
+        Returns (interval, next_poll_at) so callers can persist them.
+        """
+        now = time.time() if now is None else now
+        self._in_flight.discard(feed_id)
+        interval = self._intervals.get(feed_id, self.base_interval)
+        if outcome is not None and not outcome.failed:
+            interval = self.adapt_interval(interval, outcome)
+        self._intervals[feed_id] = interval
+
+        if outcome is not None and outcome.failed:
+            delay = self.failure_delay(interval, outcome.failures)
+        else:
+            delay = interval * random.uniform(1 - JITTER, 1 + JITTER)
+        if outcome is not None and outcome.retry_after:
+            delay = max(delay, outcome.retry_after)
+        if outcome is not None and outcome.safety_interval and not outcome.failed:
+            # The adapted interval is kept, so polling resumes at it if pushes stop
+            delay = max(delay, outcome.safety_interval * random.uniform(1 - JITTER, 1 + JITTER))
+        next_poll_at = now + delay
+        self._push(feed_id, next_poll_at)
+        return interval, next_poll_at
+
+    def failure_delay(self, interval: float, failures: int) -> float:
+        """
+        Exponential backoff from the feed's own interval, capped at the maximum
+        interval and fully jittered in its upper half so failing feeds spread out.
+        """
+        delay = min(interval * 2 ** max(failures - 1, 0), self.max_interval)
+        return delay * random.uniform(0.5, 1.0)
+
+    def adapt_interval(self, interval: float, outcome: PollOutcome) -> float:
+        if outcome.new_entries:
+            interval *= SHRINK_FACTOR
+        else:
+            interval *= GROWTH_FACTOR
+
+        # Never wait much longer than the feed's own publishing rhythm
+        if outcome.publish_gap:
+            interval = min(interval, max(outcome.publish_gap, self.min_interval))
+
+        # Publisher hints (ttl, sy:updatePeriod, Cache-Control) are lower bounds
+        if outcome.min_interval:
+            interval = max(interval, outcome.min_interval)
+
+        return self._clamp(interval)
+
+    def _push(self, feed_id: int, poll_at: float) -> None:
+        self._next_poll_at[feed_id] = poll_at
+        heapq.heappush(self._heap, (poll_at, feed_id))
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self.min_interval), self.max_interval)
+
+
+def feed_interval_hint(feed) -> float | None:
+    """Minimum poll interval in seconds requested by a feed's <ttl> or sy:updatePeriod."""
+    hints = []
+
+    ttl = feed.get("ttl")
+    if ttl:
+        try:
+            hints.append(int(ttl) * 60)
+        except ValueError:
+            pass
+
+    period = UPDATE_PERIODS.get(str(feed.get("sy_updateperiod", "")).strip().lower())
+    if period:
+        try:
+            frequency = max(int(feed.get("sy_updatefrequency") or 1), 1)
+        except ValueError:
+            frequency = 1
+        hints.append(period / frequency)
+
+    return max(hints) if hints else None
+
+
+def cache_control_hint(headers) -> float | None:
+    """max-age from a Cache-Control header, in seconds."""
+    cache_control = headers.get("cache-control") if headers else None
+    if not cache_control:
+        return None
+    for directive in cache_control.split(","):
+        name, _, value = directive.strip().partition("=")
+        if name.lower() == "max-age":
+            try:
+                return float(value.strip('"'))
+            except ValueError:
+                return None
+    return None
+
+
+def retry_after_hint(headers, now: float | None = None) -> float | None:
+    """Delay in seconds from a Retry-After header, which is either seconds or an HTTP date."""
+    retry_after = headers.get("retry-after") if headers else None
+    if not retry_after:
+        return None
+    retry_after = retry_after.strip()
+    if retry_after.isdigit():
+        return float(retry_after)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, retry_at.timestamp() - now)
+
+
+def publish_gap(entries, sample: int = 10) -> float | None:
+    """Average number of seconds between the most recent published entries."""
+    timestamps = []
+    for entry in entries[:sample]:
+        parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+        if parsed:
+            timestamps.append(calendar.timegm(parsed))
+    if len(timestamps) < 2:
+        return None
+    timestamps.sort()
+    return (timestamps[-1] - timestamps[0]) / (len(timestamps) - 1)
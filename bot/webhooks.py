@@ -0,0 +1,70 @@
+"""
+Forum posting through channel webhooks.
+
+Webhooks are rate limited per webhook rather than sharing the bot user's
+buckets, and can post under each feed's own name and image. One webhook per
+forum channel is created on first use and kept in the database. Channels
+where the bot may not manage webhooks are posted to as the bot instead.
+"""
+import logging
+import re
+import time
+from urllib.parse import urlparse
+import discord
+from bot import db
+
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_NAME = "DiscoRSS"
+# A channel whose webhook could not be set up is tried again after this long
+UNAVAILABLE_RETRY_SECONDS = 3600
+MAX_USERNAME_LENGTH = 80
+# Discord refuses webhook usernames containing these
+RESERVED_USERNAME_PARTS = re.compile("discord|clyde", re.IGNORECASE)
+
+
+class WebhookManager:
+    """Finds or creates the webhook of each forum channel, remembering which channels have none."""
+
+    def __init__(self, client: discord.Client):
+        self.client = client
+        self._webhooks: dict[int, discord.Webhook] = {}
+        # Channel ID -> monotonic time until which posts there go through the bot
+        self._unavailable: dict[int, float] = {}
+
+    async def get(self, channel: discord.ForumChannel) -> discord.Webhook | None:
+        """The channel's webhook, or None if posts there should go through the bot."""
+        webhook = self._webhooks.get(channel.id)
+        if webhook is not None:
+            return webhook
+        if time.monotonic() < self._unavailable.get(channel.id, 0.0):
+            return None
+
+        row = await db.get_forum_webhook(channel.id)
+        if row is not None:
+            webhook = discord.Webhook.partial(row["webhook_id"], row["webhook_token"], client=self.client)
+        else:
+            try:
+                webhook = await channel.create_webhook(name=WEBHOOK_NAME, reason="Posting RSS feeds")
+            except discord.HTTPException as e:
+                # Usually a missing Manage Webhooks permission, or the channel's webhook limit
+                logger.warning(f"Cannot create a webhook in channel {channel.id}, posting as the bot: {e}")
+                self._unavailable[channel.id] = time.monotonic() + UNAVAILABLE_RETRY_SECONDS
+                return None
+            await db.save_forum_webhook(channel.id, webhook.id, webhook.token)
+            logger.info(f"Created webhook {webhook.id} for channel {channel.id}")
+        self._webhooks[channel.id] = webhook
+        return webhook
+
+    async def forget(self, channel_id: int):
+        """Drop a webhook that was deleted or lost its permissions; the next post sets one up again."""
+        self._webhooks.pop(channel_id, None)
+        await db.delete_forum_webhook(channel_id)
+
+
+def webhook_username(feed_name: str | None, feed_url: str) -> str | None:
+    """A name a feed's webhook posts can use: its own name, or else its site's host."""
+    name = feed_name or urlparse(feed_url).hostname or ""
+    name = " ".join(RESERVED_USERNAME_PARTS.sub("", name).split())[:MAX_USERNAME_LENGTH].strip()
+    return name or None
@@ -0,0 +1,335 @@
+"""
+WebSub (PubSubHubbub) subscriber.
+
+When a poll finds that a feed advertises a hub, the feed is subscribed to
+it. The hub then pushes new content to a small callback server, which
+checks the HMAC signature and hands the document to the poller's usual
+dedup and outbox path. Callback paths carry a token derived from the
+subscription's secret, and a subscription is only confirmed while this
+process is waiting for it, so nobody else can switch a feed to push. While a subscription is active, the feed is only
+polled at the safety interval, to catch anything the hub drops.
+
+Subscriptions are stored per normalized feed URL, so they survive restarts
+and are shared by every feed, and every worker, polling that URL. Leases
+are renewed well before they run out; a subscription whose feeds were all
+removed is unsubscribed.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import re
+import secrets
+import time
+from typing import TYPE_CHECKING
+import aiohttp
+from aiohttp import web
+from discord.ext import tasks
+from bot import db, metrics
+from bot.config import (
+    get_fetch_timeout,
+    get_max_feed_bytes,
+    get_websub_host,
+    get_websub_lease_seconds,
+    get_websub_port,
+    get_websub_safety_interval,
+)
+from bot.fetcher import USER_AGENT, normalize_url
+from bot.parsing import ParsedFeed
+
+if TYPE_CHECKING:
+    from bot.rss_poller import RSSPoller
+
+
+logger = logging.getLogger(__name__)
+
+RENEWAL_PASS_SECONDS = 60
+# Subscribe requests sent per renewal pass
+RENEWAL_BATCH_SIZE = 50
+# A failed request, or one the hub never verifies, is sent again after this long
+SUBSCRIBE_RETRY_SECONDS = 3600
+# A hub that refused a subscription is asked again after this long
+DENIED_RETRY_SECONDS = 7 * 86400
+# Leases are renewed once this share of them has passed
+RENEW_AT_LEASE_FRACTION = 0.8
+
+SIGNATURE_ALGORITHMS = {
+    "sha1": hashlib.sha1,
+    "sha256": hashlib.sha256,
+    "sha384": hashlib.sha384,
+    "sha512": hashlib.sha512,
+}
+LINK_VALUE = re.compile(r"<([^>]*)>([^<]*)")
+REL_PARAM = re.compile(r'\brel\s*=\s*"?([^";,]+)', re.IGNORECASE)
+
+
+class WebSubSubscriber:
+    """
+    Discovers hubs and tracks which feeds are pushed in every polling process.
+    Only the process that serves the callbacks (serve=True) also sends
+    subscription requests, since it is the one the hubs verify them with.
+    """
+
+    def __init__(self, poller: "RSSPoller", callback_url: str, serve: bool = True):
+        self.poller = poller
+        self.callback_url = callback_url
+        self.serve = serve
+        self.host = get_websub_host()
+        self.port = get_websub_port()
+        self.lease_seconds = get_websub_lease_seconds()
+        self.safety_interval = get_websub_safety_interval() * 60
+        # Hub and topic per feed URL, as stored, so discovery only writes on changes
+        self._known: dict[str, tuple[str, str]] = {}
+        # Feed URLs with an active subscription
+        self._pushed: set[str] = set()
+        # Subscription id -> when this process last asked its hub to subscribe
+        self._requested: dict[int, float] = {}
+        self._ingests: set[asyncio.Task] = set()
+        self._runner: web.AppRunner | None = None
+        self._session: aiohttp.ClientSession | None = None
+
+    def start(self):
+        self.renew.start()
+
+    async def close(self):
+        if self.renew.is_running():
+            self.renew.cancel()
+        for ingest in self._ingests:
+            ingest.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def is_pushed(self, url: str) -> bool:
+        """Whether a hub currently pushes the feed at this normalized URL."""
+        return url in self._pushed
+
+    async def discovered(self, url: str, parsed_feed: ParsedFeed, headers: dict[str, str]):
+        """Note the hub a freshly fetched feed advertises, if any, to subscribe on the next pass."""
+        # Link headers take precedence over links in the document
+        hub, topic = link_header_links(headers.get("link", ""))
+        hub = hub or parsed_feed.hub
+        topic = topic or parsed_feed.topic or headers.get("content-location") or url
+        if not hub or self._known.get(url) == (hub, topic):
+            return
+        self._known[url] = (hub, topic)
+        try:
+            await db.save_websub_subscription(url, hub, topic, secrets.token_hex(32))
+        except Exception as e:
+            logger.error(f"Failed to store WebSub hub {hub} for {url}: {e}")
+
+    @tasks.loop(seconds=RENEWAL_PASS_SECONDS)
+    async def renew(self):
+        await self.renew_once()
+
+    async def renew_once(self):
+        """Drop subscriptions nobody needs and send the subscribe requests that are due."""
+        try:
+            await self._refresh()
+            if not self.serve:
+                return
+            now = time.time()
+            rows = await db.claim_websub_renewals(now, now + SUBSCRIBE_RETRY_SECONDS, RENEWAL_BATCH_SIZE)
+            await asyncio.gather(*(self._subscribe(row) for row in rows))
+        except Exception as e:
+            logger.error(f"Error renewing WebSub subscriptions: {e}")
+
+    async def _refresh(self):
+        pushed_before = set(self._pushed)
+        feed_urls = {normalize_url(feed_row["url"]) for feed_row in await db.get_all_feeds()}
+        subscriptions = await db.get_websub_subscriptions()
+        orphans = [row for row in subscriptions if row["feed_url"] not in feed_urls]
+        if orphans and self.serve:
+            # Deleted first, so the hub's verification of the unsubscribe finds them gone
+            await db.delete_websub_subscriptions(row["id"] for row in orphans)
+            await db.flush_writes()
+            for row in orphans:
+                try:
+                    await self._request(row, "unsubscribe")
+                except Exception as e:
+                    logger.warning(f"Failed to unsubscribe from {row['topic_url']} at {row['hub_url']}: {e}")
+
+        now = time.time()
+        self._requested = {
+            subscription_id: sent for subscription_id, sent in self._requested.items()
+            if sent > now - SUBSCRIBE_RETRY_SECONDS
+        }
+        subscriptions = [row for row in subscriptions if row["feed_url"] in feed_urls]
+        self._known = {row["feed_url"]: (row["hub_url"], row["topic_url"]) for row in subscriptions}
+        # Read back so subscriptions verified by another worker's server count too,
+        # keeping those verified here while the rows were being read
+        self._pushed = {
+            row["feed_url"] for row in subscriptions
+            if row["status"] == "active" and (row["lease_expires_at"] or 0) > now
+        } | (self._pushed - pushed_before)
+
+    async def _subscribe(self, row):
+        # Noted first, since a hub may verify before it answers the request
+        self._requested[row["id"]] = time.time()
+        try:
+            await self._request(row, "subscribe")
+        except Exception as e:
+            self._requested.pop(row["id"], None)
+            logger.warning(f"WebSub subscription to {row['topic_url']} at {row['hub_url']} failed: {e}")
+            # An active subscription keeps its current lease until then
+            await db.fail_websub_subscription(row["id"], row["status"], str(e) or type(e).__name__)
+        else:
+            logger.info(f"Requested WebSub subscription to {row['topic_url']} at {row['hub_url']}")
+
+    async def _request(self, row, mode: str):
+        data = {
+            "hub.mode": mode,
+            "hub.topic": row["topic_url"],
+            "hub.callback": f"{self.callback_url}/websub/{row['id']}/{callback_token(row['secret'])}",
+        }
+        if mode == "subscribe":
+            data["hub.secret"] = row["secret"]
+            data["hub.lease_seconds"] = str(self.lease_seconds)
+        async with self._get_session().post(row["hub_url"], data=data) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"hub answered HTTP {response.status}: {(await response.text())[:200]}")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=get_fetch_timeout()),
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self._session
+
+    async def start_server(self):
+        app = web.Application(client_max_size=get_max_feed_bytes())
+        app.router.add_get("/websub/{subscription_id}/{token}", self._verify)
+        app.router.add_post("/websub/{subscription_id}/{token}", self._receive)
+        # Callbacks of subscriptions made before they carried a token; pushes are signed anyway
+        app.router.add_post("/websub/{subscription_id}", self._receive)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"WebSub callbacks served on {self.host}:{self.port} as {self.callback_url}")
+
+    async def _subscription(self, request: web.Request):
+        try:
+            subscription_id = int(request.match_info["subscription_id"])
+        except ValueError:
+            return None
+        return await db.get_websub_subscription(subscription_id)
+
+    async def _verify(self, request: web.Request) -> web.Response:
+        """Answer a hub's verification of intent, or note that it denied a subscription."""
+        query = request.query
+        mode = query.get("hub.mode")
+        topic = query.get("hub.topic")
+        row = await self._subscription(request)
+        # Ids are sequential and topics public, so only the token shows the hub got the callback from us
+        if row is not None and not hmac.compare_digest(request.match_info["token"], callback_token(row["secret"])):
+            raise web.HTTPNotFound()
+
+        if mode == "denied":
+            if row is not None and topic == row["topic_url"]:
+                reason = query.get("hub.reason") or "denied by hub"
+                logger.warning(f"Hub {row['hub_url']} denied the subscription to {topic}: {reason}")
+                await db.fail_websub_subscription(row["id"], "denied", reason, time.time() + DENIED_RETRY_SECONDS)
+                self._pushed.discard(row["feed_url"])
+            return web.Response()
+
+        challenge = query.get("hub.challenge")
+        if not challenge:
+            raise web.HTTPBadRequest()
+        if mode == "subscribe":
+            requested = self._requested.get(row["id"], 0.0) if row is not None else 0.0
+            if row is None or topic != row["topic_url"] or requested < time.time() - SUBSCRIBE_RETRY_SECONDS:
+                raise web.HTTPNotFound()
+            del self._requested[row["id"]]
+            try:
+                lease_seconds = int(query["hub.lease_seconds"])
+            except (KeyError, ValueError):
+                lease_seconds = self.lease_seconds
+            now = time.time()
+            await db.activate_websub_subscription(
+                row["id"], now + lease_seconds, now + lease_seconds * RENEW_AT_LEASE_FRACTION
+            )
+            self._pushed.add(row["feed_url"])
+            logger.info(f"WebSub subscription to {topic} active for {lease_seconds}s")
+        elif mode == "unsubscribe":
+            # Only subscriptions that were dropped here may be unsubscribed
+            if row is not None:
+                raise web.HTTPNotFound()
+        else:
+            raise web.HTTPBadRequest()
+        return web.Response(text=challenge)
+
+    async def _receive(self, request: web.Request) -> web.Response:
+        """Accept a content notification and process it in the background."""
+        row = await self._subscription(request)
+        if row is None:
+            metrics.WEBSUB_NOTIFICATIONS.inc(result="unknown")
+            # Tells the hub to stop delivering to this callback
+            raise web.HTTPGone()
+
+        body = await request.read()
+        if not verify_signature(row["secret"], body, request.headers.get("X-Hub-Signature")):
+            metrics.WEBSUB_NOTIFICATIONS.inc(result="bad_signature")
+            logger.warning(f"Ignoring WebSub notification for {row['topic_url']} with a missing or bad signature")
+            # Acknowledged anyway, as the spec asks, so a forger learns nothing
+            return web.Response(status=202)
+
+        metrics.WEBSUB_NOTIFICATIONS.inc(result="accepted")
+        headers = {key.lower(): value for key, value in request.headers.items()}
+        # feedparser resolves relative links against content-location
+        headers["content-location"] = row["topic_url"]
+        ingest = asyncio.create_task(self._ingest(row["feed_url"], body, headers))
+        self._ingests.add(ingest)
+        ingest.add_done_callback(self._ingests.discard)
+        return web.Response(status=202)
+
+    async def _ingest(self, url: str, body: bytes, headers: dict[str, str]):
+        try:
+            await self.poller.ingest_pushed(url, body, headers)
+        except Exception as e:
+            logger.error(f"Error processing WebSub notification for {url}: {e}")
+
+    @renew.before_loop
+    async def before_renew(self):
+        # Pushed posts need the forum channels the gateway only knows once ready
+        if self.poller.bot is not None:
+            await self.poller.bot.wait_until_ready()
+        if not self.serve:
+            return
+        try:
+            await self.start_server()
+        except OSError as e:
+            # Usually another process on this host already serves the callbacks
+            logger.error(f"Cannot serve WebSub callbacks on {self.host}:{self.port}, leaving them to others: {e}")
+            self.serve = False
+
+
+def link_header_links(value: str) -> tuple[str | None, str | None]:
+    """The rel="hub" and rel="self" targets of an HTTP Link header."""
+    hub = topic = None
+    for target, params in LINK_VALUE.findall(value):
+        match = REL_PARAM.search(params)
+        rels = match.group(1).lower().split() if match else []
+        if "hub" in rels and hub is None:
+            hub = target.strip()
+        if "self" in rels and topic is None:
+            topic = target.strip()
+    return hub, topic
+
+
+def callback_token(secret: str) -> str:
+    """The unguessable part of a subscription's callback path, derived from its secret."""
+    return hmac.new(secret.encode(), b"websub callback", hashlib.sha256).hexdigest()[:32]
+
+
+def verify_signature(secret: str, body: bytes, header: str | None) -> bool:
+    """Check an X-Hub-Signature header ("sha256=<hex>" and the like) against the body."""
+    if not header:
+        return False
+    method, _, signature = header.partition("=")
+    algorithm = SIGNATURE_ALGORITHMS.get(method.strip().lower())
+    if algorithm is None:
+        return False
+    expected = hmac.new(secret.encode(), body, algorithm).hexdigest()
+    return hmac.compare_digest(expected, signature.strip().lower())
@@ -0,0 +1,92 @@
+"""
+Standalone poller process: `python -m bot.worker`.
+
+Any number of workers can run next to a bot started with POLLER_MODE=gateway,
+on the same host or anywhere the database is shared. Each worker leases due
+feeds in the database, fetches, parses and dedupes them on its own, and
+writes ready-to-post entries to the outbox table for the gateway to post.
+A worker that stops renewing its leases loses them once they expire, and
+its feeds are picked up by the others.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import discord
+from bot import db
+from bot.config import (
+    get_feed_lease_seconds,
+    get_lease_batch_size,
+    get_metrics_host,
+    get_metrics_port,
+)
+from bot.metrics import MetricsServer
+from bot.rss_poller import RSSPoller
+
+
+logger = logging.getLogger(__name__)
+
+
+class FeedWorker(RSSPoller):
+    """An RSSPoller that takes its feeds from database leases and posts through the outbox."""
+
+    def __init__(self, worker_id: str | None = None):
+        super().__init__(None)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = get_feed_lease_seconds()
+        self.lease_batch_size = get_lease_batch_size()
+
+    async def _due_feeds(self) -> list:
+        now = time.time()
+        # Keep the leases of feeds still being worked on from expiring under us
+        await db.renew_feed_leases(self.worker_id, now + self.lease_seconds)
+        feeds = await db.claim_due_feeds(
+            self.worker_id, now, now + self.lease_seconds, self.lease_batch_size
+        )
+        if not feeds:
+            return []
+        # The database is the schedule here; another worker may have polled any of these
+        self.scheduler.replace(feeds, now)
+        due = set(self.scheduler.pop_due(now))
+        return [feed_row for feed_row in feeds if feed_row["id"] in due]
+
+    async def _run_cycle(self, feeds):
+        try:
+            await super()._run_cycle(feeds)
+        finally:
+            # The cycle has flushed the feeds' new schedules, so no other worker takes them early
+            await db.release_feed_leases(self.worker_id, [feed_row["id"] for feed_row in feeds])
+            await db.flush_writes()
+
+    def _get_forum_channel(self, feed_row) -> discord.Object:
+        # Channels are resolved by the gateway when it posts
+        return discord.Object(id=feed_row["forum_channel_id"])
+
+
+async def run():
+    await db.init_db()
+    worker = FeedWorker()
+
+    metrics_server = None
+    if get_metrics_port():
+        metrics_server = MetricsServer(get_metrics_host(), get_metrics_port())
+        await metrics_server.start()
+
+    worker.start_polling()
+    logger.info(f"Feed worker {worker.worker_id} started")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await worker.close()
+        if metrics_server:
+            await metrics_server.stop()
+        await db.close_db()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass